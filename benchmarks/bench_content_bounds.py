@@ -0,0 +1,188 @@
+"""
+Checks find_content_bounds against the original contour-based implementation
+and benchmarks it, at full resolution and coarse-to-fine.
+
+    python -m benchmarks.bench_content_bounds [--megapixels 12] [--repeats 5]
+
+Every mode must match the original exactly; the run fails on any box that
+differs. Timings are taken on the quadrants of the synthetic layouts, whose
+content fills them, as in the panels post-processing measures, and on large
+panels with a small subject, where the coarse-to-fine path pays off.
+"""
+
+import argparse
+import logging
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.suite import time_calls
+from benchmarks.synthetic import LAYOUTS, make_composite
+from utils.image_utils import find_content_bounds
+
+Box = Optional[Tuple[int, int, int, int]]
+
+CONFIG = {"trimming": {"canny_threshold": 30}}
+
+log = logging.getLogger("benchmarks")
+
+
+def reference_find_content_bounds(image: np.ndarray, config: dict) -> Box:
+    """The original implementation: trace every contour, stack their points."""
+    canny_threshold = config.get("trimming", {}).get("canny_threshold", 30)
+    grayscale = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(grayscale, (5, 5), 0)
+    edges = cv2.Canny(blurred, canny_threshold, canny_threshold * 2)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    x, y, w, h = cv2.boundingRect(np.vstack([c for c in contours]))
+    return (int(x), int(y), int(w), int(h))
+
+
+def random_panels(samples: int, seed: int = 1) -> Iterator[np.ndarray]:
+    """Small colour panels: noise, flat fields with blocks, and blocky images."""
+    rng = np.random.default_rng(seed)
+    for i in range(samples):
+        h, w = (int(v) for v in rng.integers(1, 400, size=2))
+        kind = i % 4
+        if kind == 0:
+            panel = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        elif kind == 1:
+            panel = np.full((h, w, 3), 235, dtype=np.uint8)
+            for _ in range(int(rng.integers(0, 4))):
+                y, x = int(rng.integers(0, h)), int(rng.integers(0, w))
+                size = rng.integers(1, 60, size=2)
+                panel[y : y + size[0], x : x + size[1]] = rng.integers(0, 256, size=3)
+        elif kind == 2:
+            blocks = rng.integers(0, 256, size=(h // 8 + 1, w // 8 + 1, 3))
+            panel = np.repeat(np.repeat(blocks, 8, 0), 8, 1)[:h, :w].astype(np.uint8)
+        else:
+            # A faint subject: edges close to the Canny thresholds.
+            panel = np.full((h, w, 3), 200, dtype=np.uint8)
+            cv2.circle(panel, (w // 2, h // 2), min(h, w) // 3, (212, 214, 216), -1)
+        yield np.ascontiguousarray(panel)
+
+
+def synthetic_panels(megapixels: float) -> Iterator[np.ndarray]:
+    """The four quadrants of every synthetic layout, lossless and as JPEG."""
+    for layout in LAYOUTS:
+        image = make_composite(layout, megapixels).image
+        _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        for composite in (image, cv2.imdecode(encoded, cv2.IMREAD_COLOR)):
+            h, w = composite.shape[:2]
+            for ys, xs in [
+                (slice(0, h // 2), slice(0, w // 2)),
+                (slice(0, h // 2), slice(w // 2, w)),
+                (slice(h // 2, h), slice(0, w // 2)),
+                (slice(h // 2, h), slice(w // 2, w)),
+            ]:
+                yield np.ascontiguousarray(composite[ys, xs])
+
+
+def sparse_panels(
+    megapixels: float, count: int = 8, seed: int = 2
+) -> Iterator[np.ndarray]:
+    """Quadrant-sized panels with one small, soft-edged subject, as JPEG."""
+    rng = np.random.default_rng(seed)
+    h = int(np.sqrt(megapixels * 1e6 / 4 * 3 / 4))
+    w = h * 4 // 3
+    for _ in range(count):
+        panel = np.full((h, w, 3), 235, dtype=np.uint8)
+        radius = int(rng.integers(h // 16, h // 6))
+        center = (
+            int(rng.integers(radius, w - radius)),
+            int(rng.integers(radius, h - radius)),
+        )
+        cv2.circle(
+            panel, center, radius, [int(v) for v in rng.integers(120, 220, size=3)], -1
+        )
+        _, encoded = cv2.imencode(".jpg", panel, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        yield cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def deviation(expected: Box, actual: Box) -> float:
+    """The largest difference of any side of the two boxes (inf if one is None)."""
+    if expected is None or actual is None:
+        return 0.0 if expected == actual else float("inf")
+    ex, ey, ew, eh = expected
+    ax, ay, aw, ah = actual
+    return max(
+        abs(ex - ax), abs(ey - ay), abs(ex + ew - ax - aw), abs(ey + eh - ay - ah)
+    )
+
+
+def compare(panels: List[np.ndarray], config: dict) -> Tuple[int, float]:
+    """Panels whose box differs from the reference, and the largest deviation."""
+    mismatches, worst = 0, 0.0
+    for panel in panels:
+        off = deviation(
+            reference_find_content_bounds(panel, config),
+            find_content_bounds(panel, config),
+        )
+        mismatches += off > 0
+        worst = max(worst, off)
+    return mismatches, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--samples", type=int, default=400)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    log.setLevel(logging.INFO)
+
+    configs = [("full resolution", CONFIG)] + [
+        (
+            f"pyramid level {levels}",
+            {"trimming": dict(CONFIG["trimming"], bounds_pyramid_levels=levels)},
+        )
+        for levels in args.levels
+    ]
+
+    sets = {
+        "random": list(random_panels(args.samples)),
+        f"{args.megapixels:g}MP": list(synthetic_panels(args.megapixels)),
+        "sparse": list(sparse_panels(args.megapixels)),
+    }
+    timed = [name for name in sets if name != "random"]
+
+    def total_time(fn: Callable[[np.ndarray], object], panels) -> float:
+        return sum(min(time_calls(lambda: fn(p), args.repeats)[0]) for p in panels)
+
+    log.info(
+        f"{'mode':<18}"
+        + "".join(f"{f'{name}: differ':>16}" for name in sets)
+        + "".join(f"{f'{name} (ms)':>14}{'speedup':>9}" for name in timed)
+    )
+    reference = {
+        name: total_time(lambda p: reference_find_content_bounds(p, CONFIG), sets[name])
+        for name in timed
+    }
+    log.info(
+        f"{'original':<18}{'':>{16 * len(sets)}}"
+        + "".join(f"{reference[name] * 1e3:>14.1f}{'':>9}" for name in timed)
+    )
+    failures = []
+    for mode, config in configs:
+        row = f"{mode:<18}"
+        for name, panels in sets.items():
+            mismatches, worst = compare(panels, config)
+            row += f"{f'{mismatches}/{len(panels)}':>16}"
+            if mismatches:
+                failures.append(f"{mode} on {mismatches} {name} panels ({worst:g} px)")
+        for name in timed:
+            elapsed = total_time(lambda p: find_content_bounds(p, config), sets[name])
+            row += f"{elapsed * 1e3:>14.1f}{reference[name] / elapsed:>8.1f}x"
+        log.info(row)
+    if failures:
+        log.error(f"Bounds differ from the original: {', '.join(failures)}.")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures encode throughput and output size of the encoder profiles the
+'output' config section can express, on the panels of a synthetic composite.
+
+    python -m benchmarks.bench_encoders [--megapixels 12] [--layout full] [--repeats 3]
+    python -m benchmarks.bench_encoders --image scan.jpg
+
+The synthetic panels are flat and compress far better than real scans, so
+pass --image to measure on the quadrants of a real composite instead.
+Throughput is in megabytes of raw BGR pixels encoded per second by one
+thread, so profiles can be compared independently of the panel size.
+"""
+
+import argparse
+import logging
+from typing import List, Tuple
+
+import cv2
+
+from benchmarks.suite import time_calls
+from benchmarks.synthetic import LAYOUTS, make_composite
+from core.processing import OUTPUT_FORMATS, encode_params
+from utils.image_utils import load_image
+
+# (name, profile) pairs, written as they would appear in the 'output' section.
+PROFILES: List[Tuple[str, dict]] = [
+    ("png (opencv default)", {"format": "png"}),
+    *[
+        (f"png level {level}", {"format": "png", "png": {"compression": level}})
+        for level in (0, 1, 3, 6, 9)
+    ],
+    (
+        "png level 1, rle",
+        {"format": "png", "png": {"compression": 1, "strategy": "rle"}},
+    ),
+    (
+        "png level 3, filtered",
+        {"format": "png", "png": {"compression": 3, "strategy": "filtered"}},
+    ),
+    ("png huffman only", {"format": "png", "png": {"strategy": "huffman_only"}}),
+    ("jpg (opencv default)", {"format": "jpg"}),
+    *[
+        (f"jpg quality {quality}", {"format": "jpg", "jpeg": {"quality": quality}})
+        for quality in (75, 85, 90)
+    ],
+    ("jpg 90, optimize", {"format": "jpg", "jpeg": {"quality": 90, "optimize": True}}),
+    (
+        "jpg 90, progressive",
+        {"format": "jpg", "jpeg": {"quality": 90, "progressive": True}},
+    ),
+    ("webp quality 80", {"format": "webp", "webp": {"quality": 80}}),
+    ("webp quality 90", {"format": "webp", "webp": {"quality": 90}}),
+    ("webp lossless", {"format": "webp", "webp": {"quality": 101}}),
+]
+
+log = logging.getLogger("benchmarks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--layout", choices=list(LAYOUTS), default="full")
+    parser.add_argument("--image", type=str, default=None, help="A real composite.")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    log.setLevel(logging.INFO)
+
+    if args.image:
+        image = load_image(args.image)
+        if image is None:
+            raise SystemExit(1)
+        source = args.image
+        cy, cx = (side // 2 for side in image.shape[:2])
+    else:
+        composite = make_composite(args.layout, args.megapixels)
+        image, (cx, cy) = composite.image, composite.center
+        source = f"{args.layout}@{args.megapixels:g}MP"
+    panels = [image[:cy, :cx], image[:cy, cx:], image[cy:, :cx], image[cy:, cx:]]
+    raw_mb = sum(p.nbytes for p in panels) / 1e6
+
+    log.info(f"{len(panels)} panels of {source}, " f"{raw_mb:.1f} MB of pixels.\n")
+    log.info(
+        f"{'profile':<26}{'time (ms)':>11}{'MB/s':>9}{'size (KB)':>12}{'ratio':>8}"
+    )
+    for name, profile in PROFILES:
+        ext = OUTPUT_FORMATS[profile["format"]]
+        params = encode_params(profile, ext)
+
+        def encode():
+            return [cv2.imencode(ext, panel, params)[1] for panel in panels]
+
+        samples, encoded = time_calls(encode, args.repeats, warmup=1)
+        best = min(samples)
+        size = sum(e.nbytes for e in encoded)
+        log.info(
+            f"{name:<26}{best * 1e3:>11.1f}{raw_mb / best:>9.1f}"
+            f"{size / 1e3:>12.0f}{raw_mb * 1e6 / size:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmarks the vectorized find_precise_bounds against the original
+per-pixel band scan and checks that both return identical bounds.
+
+    python -m benchmarks.bench_precise_bounds [--width 8192] [--repeats 3]
+"""
+
+import argparse
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from benchmarks.suite import time_calls
+from utils.image_utils import find_precise_bounds
+
+CONFIG = {"divider_color_tolerance": 15, "band_thickness": 21}
+
+
+def reference_find_precise_bounds(
+    gray_image: np.ndarray, center_x: int, center_y: int, config: dict
+):
+    """The original implementation: one np.median call per scanned pixel."""
+    height, width = gray_image.shape
+    tolerance = config.get("divider_color_tolerance", 15)
+    half_band = config.get("band_thickness", 21) // 2
+    rows = slice(max(0, center_y - half_band), min(height, center_y + half_band + 1))
+    cols = slice(max(0, center_x - half_band), min(width, center_x + half_band + 1))
+    patch = gray_image[rows, cols]
+    if patch.size == 0:
+        return None
+    divider_color = float(np.median(patch))
+    x_start = center_x
+    for x in range(center_x, -1, -1):
+        if abs(np.median(gray_image[rows, x]) - divider_color) > tolerance:
+            break
+        x_start = x
+    x_end = center_x
+    for x in range(center_x, width):
+        if abs(np.median(gray_image[rows, x]) - divider_color) > tolerance:
+            break
+        x_end = x
+    y_start = center_y
+    for y in range(center_y, -1, -1):
+        if abs(np.median(gray_image[y, cols]) - divider_color) > tolerance:
+            break
+        y_start = y
+    y_end = center_y
+    for y in range(center_y, height):
+        if abs(np.median(gray_image[y, cols]) - divider_color) > tolerance:
+            break
+        y_end = y
+    return x_start, x_end + 1, y_start, y_end + 1
+
+
+def make_cases(width: int, seed: int = 0) -> List[Tuple[str, np.ndarray, int, int]]:
+    """Grayscale test images (name, image, center_x, center_y) of the given width."""
+    rng = np.random.default_rng(seed)
+    height = width // 2
+    cx, cy = width // 2, height // 2
+
+    # Light, uniform background: every scan runs to the image border.
+    uniform = np.full((height, width), 235, dtype=np.uint8)
+
+    # Noisy panels separated by dark 8px dividers: scans stop at the panels.
+    divided = rng.integers(120, 256, size=(height, width), dtype=np.uint8)
+    divided[:, cx - 4 : cx + 4] = 20
+    divided[cy - 4 : cy + 4, :] = 20
+
+    # Light panels with a light divider: the horizontal scan crosses the panels.
+    light = rng.integers(225, 245, size=(height, width), dtype=np.uint8)
+    light[cy - 4 : cy + 4, :] = 240
+
+    return [
+        ("uniform", uniform, cx, cy),
+        ("dividers", divided, cx, cy),
+        ("light_divider", light, cx, cy),
+    ]
+
+
+def check_equivalence(samples: int = 200, seed: int = 1) -> int:
+    """Compares both implementations on random small images; returns mismatches."""
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for _ in range(samples):
+        h, w = rng.integers(8, 300, size=2)
+        image = rng.integers(0, 256, size=(h, w), dtype=np.uint8)
+        # Blocky images give long in-tolerance runs as well as short ones.
+        image = np.repeat(np.repeat(image[: h // 4 + 1, : w // 4 + 1], 4, 0), 4, 1)
+        image = np.ascontiguousarray(image[:h, :w])
+        cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+        config = dict(CONFIG, band_thickness=int(rng.integers(1, 30)))
+        expected = reference_find_precise_bounds(image, cx, cy, config)
+        actual = find_precise_bounds(image, cx, cy, config)
+        if expected != actual:
+            mismatches += 1
+            logging.error(
+                f"Mismatch at ({cx}, {cy}) in {w}x{h}: {expected} != {actual}"
+            )
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=8192)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    mismatches = check_equivalence()
+    logging.info(f"Equivalence check: {mismatches} mismatches.")
+
+    logging.info(f"{'case':<16}{'loop (ms)':>12}{'vectorized (ms)':>18}{'speedup':>10}")
+    for name, image, cx, cy in make_cases(args.width):
+        expected = reference_find_precise_bounds(image, cx, cy, CONFIG)
+        actual = find_precise_bounds(image, cx, cy, CONFIG)
+        assert expected == actual, f"{name}: {expected} != {actual}"
+        loop = min(
+            time_calls(
+                lambda: reference_find_precise_bounds(image, cx, cy, CONFIG),
+                args.repeats,
+            )[0]
+        )
+        vectorized = min(
+            time_calls(
+                lambda: find_precise_bounds(image, cx, cy, CONFIG), args.repeats
+            )[0]
+        )
+        logging.info(
+            f"{name:<16}{loop * 1000:>12.1f}{vectorized * 1000:>18.2f}"
+            f"{loop / vectorized:>9.0f}x"
+        )
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Checks the coarse-to-fine paths of projection_profile and contour_analysis
+against their full-resolution results, and benchmarks them.
+
+    python -m benchmarks.bench_pyramid [--sizes 1 4 12] [--levels 1 2 3] [--repeats 3]
+
+Each strategy splits the layouts it is meant for, losslessly and after a
+JPEG round trip, at every pyramid level. For each level the table gives how
+many splits succeeded, how many match the full-resolution result exactly
+(including whether it succeeded), the largest deviation of any panel or
+divider edge where both succeeded, and how many have wrong geometry, such
+as a panel that cuts off its subject (see benchmarks.validate_splits).
+
+Fails if a pyramid level succeeds where full resolution fails or the other
+way round, since that changes which strategy wins; if it gets the geometry
+wrong where full resolution gets it right; or if it moves an edge by more
+than three coarse pixels: the band it is refined in reaches two coarse
+pixels either side of the coarse edge, which itself may be off by one.
+Anything further means the coarse pass found something other than the
+panels and the strategy's sanity checks missed it.
+"""
+
+import argparse
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+from benchmarks.suite import load_benchmark_config, time_calls
+from benchmarks.synthetic import SyntheticComposite, make_composite
+from benchmarks.validate_splits import cases, geometry_errors
+from core.analysis import ImageAnalysis
+from core.data_models import Image, SplitResult
+from core.image_splitter import ImageSplitter
+
+# Strategy -> the layouts it splits in practice.
+STRATEGY_LAYOUTS = {
+    "projection_profile": ["full"],
+    "contour_analysis": ["full", "seamless_uniform", "seamless_complex"],
+}
+
+log = logging.getLogger("benchmarks")
+
+
+def edges(result: SplitResult) -> Optional[List[int]]:
+    """Every panel and divider edge of a successful split, in a fixed order."""
+    if not result.success:
+        return None
+    values = [v for x, y, w, h in result.panel_rects for v in (x, y, x + w, y + h)]
+    return values + list(result.divider_bounds or ())
+
+
+def deviation(expected: Optional[List[int]], actual: Optional[List[int]]) -> float:
+    """The largest difference of any edge (inf if only one split succeeded)."""
+    if expected is None or actual is None or len(expected) != len(actual):
+        return 0.0 if expected == actual else float("inf")
+    return max((abs(e - a) for e, a in zip(expected, actual)), default=0.0)
+
+
+def corpus(
+    layouts: List[str], sizes: List[float], jpeg_quality: int
+) -> Iterator[Tuple[str, SyntheticComposite, Image]]:
+    for megapixels in sizes:
+        for layout in layouts:
+            composite = make_composite(layout, megapixels)
+            for suffix, image in cases(composite, jpeg_quality):
+                yield f"{layout}@{megapixels:g}MP{suffix}", composite, image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=list(STRATEGY_LAYOUTS),
+        default=list(STRATEGY_LAYOUTS),
+    )
+    parser.add_argument("--jpeg-quality", type=int, default=85)
+    parser.add_argument("--tolerance", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--config", type=str, default="config.yaml")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    log.setLevel(logging.INFO)
+
+    base = load_benchmark_config(args.config)
+    regressions = []
+    for name in args.strategies:
+        cases_ = list(corpus(STRATEGY_LAYOUTS[name], args.sizes, args.jpeg_quality))
+        log.info(f"\n{name}: {len(cases_)} composites")
+        log.info(
+            f"{'levels':<8}{'ok':>6}{'exact':>8}{'max px':>8}{'wrong':>7}"
+            f"{'time (ms)':>12}{'speedup':>9}"
+        )
+        reference, reference_time = {}, 0.0
+        for levels in [0] + args.levels:
+            config = dict(base)
+            config[name] = dict(base.get(name, {}), pyramid_levels=levels)
+            strategy = ImageSplitter(config).get_strategy(name)
+            succeeded, exact, worst, wrong, elapsed = 0, 0, 0.0, 0, 0.0
+            for case, composite, image in cases_:
+                samples, result = time_calls(
+                    lambda: strategy.split(image, case, ImageAnalysis(image)),
+                    args.repeats,
+                )
+                elapsed += min(samples)
+                if levels == 0:
+                    reference[case] = result
+                full = reference[case]
+                off = deviation(edges(full), edges(result))
+                succeeded += result.success
+                exact += off == 0
+                if result.success != full.success:
+                    outcome = "succeeds" if result.success else "fails"
+                    regressions.append(
+                        f"{name} level {levels} {outcome} on {case}, unlike level 0"
+                    )
+                if result.success and full.success:
+                    worst = max(worst, off)
+                    if off > 3 * 2**levels:
+                        regressions.append(
+                            f"{name} level {levels} on {case} ({off:g} px off)"
+                        )
+                if result.success and geometry_errors(
+                    composite, result, args.tolerance
+                ):
+                    wrong += 1
+                    if full.success and not geometry_errors(
+                        composite, full, args.tolerance
+                    ):
+                        regressions.append(f"{name} level {levels} on {case}")
+            if levels == 0:
+                reference_time = elapsed
+            log.info(
+                f"{levels:<8}{f'{succeeded}/{len(cases_)}':>6}"
+                f"{f'{exact}/{len(cases_)}':>8}{worst:>8g}{wrong:>7}"
+                f"{elapsed * 1e3:>12.1f}{reference_time / elapsed:>8.1f}x"
+            )
+    if regressions:
+        log.error(f"\nPyramid levels disagree: {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Compares two benchmark result files written by benchmarks.suite and fails
+when a gated benchmark got significantly slower than the baseline.
+
+    python -m benchmarks.compare BASELINE CURRENT [--threshold 0.10] [--alpha 0.05]
+
+A benchmark counts as a regression only if its median slowed down by more
+than the threshold (and by more than --min-delta-ms) AND a one-sided Mann-Whitney U test on the raw samples
+says the slowdown is unlikely to be noise. Prints a Markdown table of every
+benchmark found in either file.
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Benchmarks whose regressions fail the comparison, by name prefix.
+DEFAULT_GATED = ("process_image", "strategy.", "classifier")
+# Above this many sample pairs, the normal approximation is used instead of
+# the exact distribution of U.
+EXACT_PAIR_LIMIT = 2500
+# Differences smaller than this are timer noise, whatever their ratio.
+DEFAULT_MIN_DELTA_MS = 0.1
+# Environment fields that make timings incomparable when they differ.
+ENVIRONMENT_KEYS = ("platform", "cpu_count", "python", "numpy", "opencv")
+
+log = logging.getLogger("benchmarks")
+
+
+def mann_whitney_p(baseline: List[float], current: List[float]) -> float:
+    """
+    One-sided p-value of the Mann-Whitney U test for 'current' tending to be
+    larger than 'baseline'. Exact for small samples without ties; otherwise
+    the tie-corrected normal approximation with continuity correction.
+    """
+    n, m = len(baseline), len(current)
+    if n == 0 or m == 0:
+        return 1.0
+    ranks, tie_sizes = _ranks(baseline + current)
+    # U counts the (baseline, current) pairs where current is larger.
+    u = sum(ranks[n:]) - m * (m + 1) / 2
+
+    if not tie_sizes and n * m <= EXACT_PAIR_LIMIT:
+        counts = _u_distribution(n, m)
+        return sum(counts[math.ceil(u) :]) / math.comb(n + m, n)
+
+    total = n + m
+    tie_term = sum(t**3 - t for t in tie_sizes) / (total * (total - 1))
+    sigma = math.sqrt(n * m / 12 * (total + 1 - tie_term))
+    if sigma == 0:
+        return 1.0
+    z = (u - n * m / 2 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _ranks(values: List[float]) -> Tuple[List[float], List[int]]:
+    """1-based ranks (ties get their average rank) and the size of each tie."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    tie_sizes = []
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        if j > i:
+            tie_sizes.append(j - i + 1)
+        i = j + 1
+    return ranks, tie_sizes
+
+
+def _u_distribution(n: int, m: int) -> List[int]:
+    """
+    How many of the C(n + m, n) orderings of n baseline and m current samples
+    give each value of U, for U = 0 .. n * m.
+    """
+    # counts[i][k]: orderings of i baseline and j current samples with U = k,
+    # built up one current sample at a time. The largest sample is either a
+    # baseline one (U unchanged) or a current one beating all i baselines.
+    counts = [[1] for _ in range(n + 1)]
+    for j in range(1, m + 1):
+        row = [[1]]
+        for i in range(1, n + 1):
+            without_current = counts[i]
+            without_baseline = row[i - 1]
+            merged = [0] * (i * j + 1)
+            for k, c in enumerate(without_baseline):
+                merged[k] += c
+            for k, c in enumerate(without_current):
+                merged[k + i] += c
+            row.append(merged)
+        counts = row
+    return counts[n]
+
+
+def load_results(path: str) -> Tuple[dict, Dict[str, dict]]:
+    """The meta block of a result file and its results keyed by id."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("meta", {}), {r["id"]: r for r in data["results"]}
+
+
+def compare(
+    baseline: Dict[str, dict],
+    current: Dict[str, dict],
+    threshold: float,
+    alpha: float,
+    gated: Tuple[str, ...] = DEFAULT_GATED,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+) -> List[dict]:
+    """One row per benchmark id found in either run, in the current run's order."""
+    rows = []
+    ids = list(current) + [i for i in baseline if i not in current]
+    for benchmark_id in ids:
+        old, new = baseline.get(benchmark_id), current.get(benchmark_id)
+        row = {
+            "id": benchmark_id,
+            "baseline_ms": old["median_ms"] if old else None,
+            "current_ms": new["median_ms"] if new else None,
+            "change": None,
+            "p_slower": None,
+            "p_faster": None,
+            "gated": benchmark_id.startswith(gated),
+        }
+        if old is None:
+            row["status"] = "new"
+        elif new is None:
+            row["status"] = "missing"
+        else:
+            row["change"] = _relative_change(old["median_ms"], new["median_ms"])
+            row["p_slower"] = mann_whitney_p(old["samples_ms"], new["samples_ms"])
+            row["p_faster"] = mann_whitney_p(new["samples_ms"], old["samples_ms"])
+            significant = abs(new["median_ms"] - old["median_ms"]) > min_delta_ms
+            if significant and row["change"] > threshold and row["p_slower"] < alpha:
+                row["status"] = "regression" if row["gated"] else "slower"
+            elif significant and row["change"] < -threshold and row["p_faster"] < alpha:
+                row["status"] = "faster"
+            else:
+                row["status"] = "unchanged"
+        rows.append(row)
+    return rows
+
+
+def _relative_change(old: float, new: float) -> float:
+    if old <= 0:
+        return 0.0 if new <= 0 else math.inf
+    return new / old - 1
+
+
+def format_table(rows: List[dict]) -> str:
+    """The comparison as a Markdown table, ready to paste into a review."""
+    lines = [
+        "| benchmark | baseline (ms) | current (ms) | change | p | status |",
+        "|---|---:|---:|---:|---:|---|",
+    ]
+    for row in rows:
+        p = row["p_faster"] if row["status"] == "faster" else row["p_slower"]
+        status = row["status"]
+        if status == "regression":
+            status = "**regression**"
+        elif not row["gated"] and status not in ("new", "missing"):
+            status += " (not gated)"
+        lines.append(
+            f"| `{row['id']}` | {_fmt(row['baseline_ms'], '.2f')} "
+            f"| {_fmt(row['current_ms'], '.2f')} | {_fmt(row['change'], '+.1%')} "
+            f"| {_fmt(p, '.3f')} | {status} |"
+        )
+    return "\n".join(lines)
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "–" if value is None else format(value, spec)
+
+
+def environment_differences(baseline_meta: dict, current_meta: dict) -> List[str]:
+    return [
+        f"{key}: {baseline_meta.get(key)} -> {current_meta.get(key)}"
+        for key in ENVIRONMENT_KEYS
+        if baseline_meta.get(key) != current_meta.get(key)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", help="Result file of the baseline run.")
+    parser.add_argument("current", help="Result file of the run to check.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative median slowdown tolerated before failing (default 0.10).",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level of the Mann-Whitney test (default 0.05).",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=DEFAULT_MIN_DELTA_MS,
+        help="Ignore median differences smaller than this many milliseconds.",
+    )
+    parser.add_argument(
+        "--gate",
+        nargs="+",
+        metavar="PREFIX",
+        default=list(DEFAULT_GATED),
+        help="Benchmarks (by name prefix) whose regressions fail the comparison.",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Also write the table to a file."
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    baseline_meta, baseline = load_results(args.baseline)
+    current_meta, current = load_results(args.current)
+    for difference in environment_differences(baseline_meta, current_meta):
+        log.warning(f"Runs were measured in different environments ({difference}).")
+
+    rows = compare(
+        baseline,
+        current,
+        args.threshold,
+        args.alpha,
+        tuple(args.gate),
+        args.min_delta_ms,
+    )
+    table = format_table(rows)
+    print(table)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(table + "\n")
+
+    regressions = [r["id"] for r in rows if r["status"] == "regression"]
+    if regressions:
+        log.error(
+            f"{len(regressions)} benchmark(s) slowed down by more than "
+            f"{args.threshold:.0%} (p < {args.alpha}): {', '.join(regressions)}"
+        )
+        sys.exit(1)
+    log.info(
+        f"No regressions beyond {args.threshold:.0%} across {len(rows)} benchmarks."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Times the classifier, every strategy, find_precise_bounds, find_content_bounds
+and end-to-end process_image on synthetic composites, and writes the timings
+as JSON so runs from different commits can be compared.
+
+    python -m benchmarks.suite [--sizes 1 4 12] [--layouts full ...] [--repeats 5]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+
+from benchmarks.synthetic import LAYOUTS, SyntheticComposite, make_composite
+from classifier.image_classifier import ImageClassifier
+from core.analysis import ImageAnalysis
+from core.image_splitter import ImageSplitter
+from core.processing import process_image
+from utils.image_utils import find_content_bounds, find_precise_bounds
+
+DEFAULT_SIZES = (1, 4, 12)
+MAX_MEGAPIXELS = 50
+
+log = logging.getLogger("benchmarks")
+
+
+def load_benchmark_config(path: str) -> dict:
+    """The repo config with everything that writes side files switched off."""
+    with open(path, "r") as f:
+        config = yaml.safe_load(f)
+    config["debug_mode"] = False
+    config["save_debug_artifacts"] = False
+    for section in ("cache", "tracing"):
+        config.setdefault(section, {})["enabled"] = False
+    return config
+
+
+def time_calls(
+    fn: Callable[[], object], repeats: int, warmup: int = 0
+) -> Tuple[List[float], object]:
+    """
+    Runs 'fn' 'warmup' times untimed, to settle caches and lazy imports,
+    then 'repeats' times; returns each timed run's seconds and the last result.
+    """
+    for _ in range(warmup):
+        fn()
+    samples, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def benchmarks_for(
+    composite: SyntheticComposite,
+    config: dict,
+    splitter: ImageSplitter,
+    output_dir: str,
+) -> Iterator[Tuple[str, Callable[[], object], Callable[[object], object]]]:
+    """
+    Yields (name, call, describe) for every benchmark of one composite.
+    Each call starts from a fresh ImageAnalysis, so nothing computed by an
+    earlier run (or an earlier benchmark) is reused. 'describe' turns the
+    call's return value into the outcome recorded next to the timings.
+    """
+    image = composite.image
+    filename = f"{composite.layout}.jpg"
+
+    yield (
+        "classifier",
+        lambda: ImageClassifier(config).diagnose(image),
+        lambda image_type: image_type.name,
+    )
+    for name, strategy in splitter.strategies.items():
+        yield (
+            f"strategy.{name}",
+            lambda strategy=strategy: strategy.split(
+                image, filename, ImageAnalysis(image)
+            ),
+            _describe_result,
+        )
+
+    # The helpers get their inputs ready-made, as the strategies pass them.
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    cx, cy = composite.center
+    bounds_config = config.get("projection_profile", {})
+    yield (
+        "find_precise_bounds",
+        lambda: find_precise_bounds(gray, cx, cy, bounds_config),
+        lambda bounds: list(bounds) if bounds else None,
+    )
+    quadrants = [image[:cy, :cx], image[:cy, cx:], image[cy:, :cx], image[cy:, cx:]]
+    yield (
+        "find_content_bounds",
+        lambda: [find_content_bounds(q, config) for q in quadrants],
+        lambda bounds: [list(b) if b else None for b in bounds],
+    )
+
+    yield (
+        "process_image",
+        lambda: process_image(image, filename, splitter, config, output_dir),
+        _describe_result,
+    )
+
+
+def _describe_result(result) -> Optional[str]:
+    if result is None:
+        return None
+    if not result.success:
+        return f"{result.strategy_used}: failed"
+    return f"{result.strategy_used}: {result.confidence:.2f}"
+
+
+def run_suite(
+    config: dict,
+    sizes: List[float],
+    layouts: List[str],
+    repeats: int,
+    only: Optional[List[str]] = None,
+    warmup: int = 0,
+) -> List[dict]:
+    """Runs every benchmark on every layout and size; returns one entry each."""
+    splitter = ImageSplitter(config)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as output_dir:
+        for megapixels in sizes:
+            for layout in layouts:
+                composite = make_composite(layout, megapixels)
+                height, width = composite.image.shape[:2]
+                for name, call, describe in benchmarks_for(
+                    composite, config, splitter, output_dir
+                ):
+                    if only and not any(name.startswith(o) for o in only):
+                        continue
+                    samples, value = time_calls(call, repeats, warmup)
+                    entry = {
+                        "id": f"{name}[{layout}@{megapixels:g}MP]",
+                        "benchmark": name,
+                        "layout": layout,
+                        "megapixels": megapixels,
+                        "width": width,
+                        "height": height,
+                        "samples_ms": [round(s * 1e3, 3) for s in samples],
+                        "min_ms": round(min(samples) * 1e3, 3),
+                        "median_ms": round(statistics.median(samples) * 1e3, 3),
+                        "outcome": describe(value),
+                    }
+                    results.append(entry)
+                    log.info(
+                        f"{entry['id']:<60}{entry['median_ms']:>12.2f} ms"
+                        f"   {entry['outcome']}"
+                    )
+    return results
+
+
+def environment() -> dict:
+    """What the results depend on besides the code: commit, libraries, machine."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=float,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        metavar="MP",
+        help=f"Composite sizes in megapixels (at most {MAX_MEGAPIXELS}).",
+    )
+    parser.add_argument(
+        "--layouts", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS)
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        metavar="PREFIX",
+        help="Only run benchmarks whose name starts with PREFIX, e.g. strategy.",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Untimed runs of each benchmark before its timed repeats.",
+    )
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Where to write the JSON results (default: bench_results/<commit>.json).",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    log.setLevel(logging.INFO)
+
+    if any(not 0 < s <= MAX_MEGAPIXELS for s in args.sizes):
+        parser.error(f"--sizes must be between 0 and {MAX_MEGAPIXELS} megapixels.")
+    if args.repeats < 1 or args.warmup < 0:
+        parser.error("--repeats must be at least 1 and --warmup at least 0.")
+
+    config = load_benchmark_config(args.config)
+    meta = environment()
+    meta.update(repeats=args.repeats, warmup=args.warmup, config=args.config)
+    results = run_suite(
+        config, args.sizes, args.layouts, args.repeats, args.only, args.warmup
+    )
+
+    output = args.output or os.path.join(
+        "bench_results", f"{(meta['commit'] or 'results')[:12]}.json"
+    )
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+        f.write("\n")
+    log.info(f"Wrote {len(results)} results to {output}.")
+
+
+if __name__ == "__main__":
+    main()
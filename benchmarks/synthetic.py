@@ -0,0 +1,151 @@
+"""
+Deterministic synthetic 2x2 composites for benchmarking. Every layout the
+classifier distinguishes can be generated at any size, and the same seed
+always produces the same pixels.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from classifier.diagnostics import ImageType
+from core.data_models import Image
+
+# Layout name -> the classification a correct classifier gives it.
+LAYOUTS = {
+    "full": ImageType.DIVIDERS_FULL,
+    "vertical_only": ImageType.DIVIDERS_VERTICAL_ONLY,
+    "horizontal_only": ImageType.DIVIDERS_HORIZONTAL_ONLY,
+    "seamless_uniform": ImageType.SEAMLESS_UNIFORM,
+    "seamless_complex": ImageType.SEAMLESS_COMPLEX,
+}
+
+# Composites are 4:3 landscape, like most scanned contact sheets.
+ASPECT_RATIO = 4 / 3
+DIVIDER_COLOR = (40, 40, 40)
+# find_precise_bounds measures dividers by the median of a band of lines
+# across them, so they must cover less than half of the default 21px band.
+DIVIDER_THICKNESS = 8
+BACKGROUND_COLOR = (240, 240, 240)
+
+
+@dataclass
+class SyntheticComposite:
+    """A generated composite and what an ideal split of it looks like."""
+
+    layout: str
+    megapixels: float
+    image: Image
+    expected_type: ImageType
+    # Centre of the dividers (or of the panel grid when there are none).
+    center: Tuple[int, int]
+    # Thickness of the dividers in pixels, 0 for seamless layouts.
+    divider_thickness: int
+    # The (x, y, w, h) box of each panel's subject, in panel order: what a
+    # split must keep whole.
+    subjects: List[Tuple[int, int, int, int]]
+
+
+def composite_size(megapixels: float) -> Tuple[int, int]:
+    """(width, height) of a 4:3 composite with roughly this many megapixels."""
+    height = int(math.sqrt(megapixels * 1e6 / ASPECT_RATIO))
+    return int(height * ASPECT_RATIO) & ~1, height & ~1
+
+
+def make_composite(layout: str, megapixels: float, seed: int = 0) -> SyntheticComposite:
+    """Generates a 2x2 composite of the given layout (see LAYOUTS) and size."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'; expected one of {list(LAYOUTS)}.")
+    rng = np.random.default_rng(seed)
+    width, height = composite_size(megapixels)
+    cx, cy = width // 2, height // 2
+    half = DIVIDER_THICKNESS // 2
+
+    if layout == "seamless_complex":
+        image = _textured_background(height, width, rng)
+    else:
+        image = np.full((height, width, 3), BACKGROUND_COLOR, dtype=np.uint8)
+
+    subjects = []
+    for x0, y0, x1, y1 in [
+        (0, 0, cx, cy),
+        (cx, 0, width, cy),
+        (0, cy, cx, height),
+        (cx, cy, width, height),
+    ]:
+        x, y, w, h = _draw_panel(
+            image[y0:y1, x0:x1],
+            rng,
+            textured=layout == "seamless_complex",
+            pale=layout == "seamless_uniform",
+        )
+        subjects.append((x0 + x, y0 + y, w, h))
+
+    vertical = layout in ("full", "vertical_only")
+    horizontal = layout in ("full", "horizontal_only")
+    if vertical:
+        image[:, cx - half : cx + half] = DIVIDER_COLOR
+    if horizontal:
+        image[cy - half : cy + half, :] = DIVIDER_COLOR
+
+    return SyntheticComposite(
+        layout=layout,
+        megapixels=megapixels,
+        image=image,
+        expected_type=LAYOUTS[layout],
+        center=(cx, cy),
+        divider_thickness=DIVIDER_THICKNESS if vertical or horizontal else 0,
+        subjects=subjects,
+    )
+
+
+def _textured_background(height: int, width: int, rng: np.random.Generator) -> Image:
+    # A diagonal gradient plus fine noise, so no colour dominates the corners.
+    gradient = np.add.outer(
+        np.linspace(0, 60, height, dtype=np.float32),
+        np.linspace(0, 90, width, dtype=np.float32),
+    )
+    tile = rng.integers(0, 24, size=(256, 256, 1), dtype=np.uint8)
+    noise = np.tile(tile, (height // 256 + 1, width // 256 + 1, 3))[:height, :width]
+    background = np.empty((height, width, 3), dtype=np.uint8)
+    for channel, offset in enumerate((90, 110, 130)):
+        background[:, :, channel] = np.clip(gradient + offset, 0, 255).astype(np.uint8)
+    return cv2.add(background, noise)
+
+
+def _draw_panel(
+    panel: Image, rng: np.random.Generator, textured: bool = False, pale: bool = False
+) -> Tuple[int, int, int, int]:
+    """
+    Draws the subject of one panel, inset from its edges, in place, and
+    returns its (x, y, w, h) box. Pale subjects stay close to the background
+    colour, as in line art or low-contrast scans.
+    """
+    height, width = panel.shape[:2]
+    margin = min(width, height) // 8
+    low, high = (200, 236) if pale else (0, 200)
+    color = tuple(int(v) for v in rng.integers(low, high, size=3))
+    cv2.rectangle(
+        panel, (margin, margin), (width - margin, height - margin), color, thickness=-1
+    )
+    radius = min(width, height) // 5
+    center = (width // 2, height // 2)
+    accent = tuple(int(v) for v in rng.integers(low, high + 56, size=3))
+    cv2.circle(panel, center, radius, accent, thickness=-1)
+    cv2.rectangle(
+        panel,
+        (width // 4, height // 4),
+        (width // 2, height // 2),
+        (190, 200, 210) if pale else (30, 60, 90),
+        thickness=max(3, min(width, height) // 200),
+    )
+    if textured:
+        inner = panel[margin : height - margin, margin : width - margin]
+        stripes = (np.arange(inner.shape[1]) // 16 % 2 * 40).astype(np.uint8)
+        inner[:] = cv2.subtract(
+            inner, np.broadcast_to(stripes[None, :, None], inner.shape).copy()
+        )
+    return margin, margin, width - 2 * margin + 1, height - 2 * margin + 1
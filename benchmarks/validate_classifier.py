@@ -0,0 +1,149 @@
+"""
+Validates the classifier's fast mode against its exact mode on a labelled
+corpus, for both agreement and speed.
+
+    python -m benchmarks.validate_classifier [--sizes 1 4 12] [--corpus DIR]
+
+The corpus is every synthetic layout at each size, for several seeds, both
+losslessly and after a JPEG round trip. Real images can be added with
+--corpus: a directory holding one subdirectory per expected ImageType name
+(e.g. DIR/DIVIDERS_FULL/*.jpg).
+"""
+
+import argparse
+import copy
+import itertools
+import logging
+import os
+import statistics
+import time
+from typing import Iterator, List, Tuple
+
+import cv2
+import yaml
+
+from benchmarks.synthetic import LAYOUTS, make_composite
+from classifier.diagnostics import ImageType
+from classifier.image_classifier import ImageClassifier
+from core.data_models import Image
+from utils.image_utils import load_image
+
+log = logging.getLogger("benchmarks")
+
+
+def synthetic_corpus(
+    sizes: List[float], seeds: int, jpeg_quality: int
+) -> Iterator[Tuple[str, Image, ImageType]]:
+    """(name, image, expected type) for every synthetic case."""
+    for megapixels in sizes:
+        for layout, expected in LAYOUTS.items():
+            for seed in range(seeds):
+                image = make_composite(layout, megapixels, seed).image
+                name = f"{layout}@{megapixels:g}MP#{seed}"
+                yield name, image, expected
+                ok, encoded = cv2.imencode(
+                    ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+                )
+                if ok:
+                    decoded = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+                    yield f"{name}.jpg", decoded, expected
+
+
+def directory_corpus(root: str) -> Iterator[Tuple[str, Image, ImageType]]:
+    """(name, image, expected type) for each image under root/<ImageType name>/."""
+    for label in sorted(os.listdir(root)):
+        label_dir = os.path.join(root, label)
+        if not os.path.isdir(label_dir) or label not in ImageType.__members__:
+            continue
+        for filename in sorted(os.listdir(label_dir)):
+            image = load_image(os.path.join(label_dir, filename))
+            if image is not None:
+                yield f"{label}/{filename}", image, ImageType[label]
+
+
+def classify(
+    classifier: ImageClassifier, image: Image, repeats: int
+) -> Tuple[ImageType, float]:
+    """The classification and the best time of 'repeats' cold runs."""
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = classifier.diagnose(image)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--jpeg-quality", type=int, default=85)
+    parser.add_argument(
+        "--corpus", type=str, default=None, help="Directory of labelled images."
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument(
+        "--min-agreement",
+        type=float,
+        default=0.95,
+        help="Fail if the modes agree on fewer than this fraction of images.",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    log.setLevel(logging.INFO)
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    exact_config = copy.deepcopy(config)
+    exact_config.setdefault("classifier", {})["mode"] = "exact"
+    fast_config = copy.deepcopy(config)
+    fast_config["classifier"]["mode"] = "fast"
+    exact, fast = ImageClassifier(exact_config), ImageClassifier(fast_config)
+
+    corpus = synthetic_corpus(args.sizes, args.seeds, args.jpeg_quality)
+    if args.corpus:
+        corpus = itertools.chain(corpus, directory_corpus(args.corpus))
+
+    total = agreed = exact_correct = fast_correct = 0
+    exact_times, fast_times = [], []
+    log.info(f"{'image':<36}{'expected':<26}{'exact':<26}{'fast':<26}speedup")
+    for name, image, expected in corpus:
+        exact_type, exact_time = classify(exact, image, args.repeats)
+        fast_type, fast_time = classify(fast, image, args.repeats)
+        total += 1
+        agreed += exact_type == fast_type
+        exact_correct += exact_type == expected
+        fast_correct += fast_type == expected
+        exact_times.append(exact_time)
+        fast_times.append(fast_time)
+        marker = "" if exact_type == fast_type else "  <- disagree"
+        log.info(
+            f"{name:<36}{expected.name:<26}{exact_type.name:<26}{fast_type.name:<26}"
+            f"{exact_time / fast_time:>6.1f}x{marker}"
+        )
+
+    if not total:
+        log.error("The corpus is empty.")
+        raise SystemExit(1)
+    agreement = agreed / total
+    log.info(
+        f"\n{total} images: fast agrees with exact on {agreement:.1%}; "
+        f"accuracy exact {exact_correct / total:.1%}, fast {fast_correct / total:.1%}."
+    )
+    log.info(
+        f"Median time: exact {_median_ms(exact_times):.2f} ms, "
+        f"fast {_median_ms(fast_times):.2f} ms "
+        f"({sum(exact_times) / sum(fast_times):.1f}x faster overall)."
+    )
+    if agreement < args.min_agreement:
+        log.error(f"Agreement is below {args.min_agreement:.0%}.")
+        raise SystemExit(1)
+
+
+def _median_ms(samples: List[float]) -> float:
+    return statistics.median(samples) * 1e3
+
+
+if __name__ == "__main__":
+    main()
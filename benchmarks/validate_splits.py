@@ -0,0 +1,162 @@
+"""
+Validates the geometry of end-to-end splits of synthetic composites against
+where their dividers and panels really are.
+
+    python -m benchmarks.validate_splits [--sizes 1 12] [--seeds 2] [--speculative]
+
+Every synthetic layout is split at each size and seed, losslessly and after a
+JPEG round trip, exactly as process_image would split it. A successful split
+fails validation when a panel reaches across the centre lines into another
+quadrant or into a divider, when it cuts off part of its quadrant's subject,
+or when a reported divider is not where SyntheticComposite.center and
+divider_thickness put it. Failed splits are reported but not counted, since
+falling back is a legitimate outcome.
+"""
+
+import argparse
+import logging
+from typing import List, Tuple
+
+import cv2
+
+from benchmarks.suite import load_benchmark_config
+from benchmarks.synthetic import LAYOUTS, SyntheticComposite, make_composite
+from classifier.diagnostics import ImageType
+from core.data_models import SplitResult
+from core.image_splitter import ImageSplitter
+from core.processing import split_image
+
+# The classification -> which of its axes carry a divider (vertical, horizontal).
+DIVIDER_AXES = {
+    ImageType.DIVIDERS_FULL: (True, True),
+    ImageType.DIVIDERS_VERTICAL_ONLY: (True, False),
+    ImageType.DIVIDERS_HORIZONTAL_ONLY: (False, True),
+}
+
+log = logging.getLogger("benchmarks")
+
+
+def geometry_errors(
+    composite: SyntheticComposite, result: SplitResult, tolerance: int
+) -> List[str]:
+    """What is wrong with the panels and dividers of a successful split."""
+    cx, cy = composite.center
+    vertical, horizontal = DIVIDER_AXES.get(composite.expected_type, (False, False))
+    half = composite.divider_thickness // 2
+    # The edges of the left/top quadrants and the starts of the right/bottom
+    # ones, with the divider (if any) between them.
+    left_end, right_start = (cx - half, cx + half) if vertical else (cx, cx)
+    top_end, bottom_start = (cy - half, cy + half) if horizontal else (cy, cy)
+
+    errors = []
+    if len(result.panel_rects) != 4:
+        return [f"{len(result.panel_rects)} panels instead of 4"]
+    for index, (x, y, w, h) in enumerate(result.panel_rects):
+        right, bottom = index % 2, index // 2
+        if right and x < right_start - tolerance:
+            errors.append(f"panel {index} starts at x={x}, before {right_start}")
+        if not right and x + w > left_end + tolerance:
+            errors.append(f"panel {index} ends at x={x + w}, after {left_end}")
+        if bottom and y < bottom_start - tolerance:
+            errors.append(f"panel {index} starts at y={y}, before {bottom_start}")
+        if not bottom and y + h > top_end + tolerance:
+            errors.append(f"panel {index} ends at y={y + h}, after {top_end}")
+        sx, sy, sw, sh = composite.subjects[index]
+        if (
+            x > sx + tolerance
+            or y > sy + tolerance
+            or x + w < sx + sw - tolerance
+            or y + h < sy + sh - tolerance
+        ):
+            errors.append(
+                f"panel {index} {(x, y, w, h)} cuts off its subject {(sx, sy, sw, sh)}"
+            )
+
+    if result.divider_bounds is not None:
+        x_start, x_end, y_start, y_end = result.divider_bounds
+        if vertical and _off((x_start, x_end), (left_end, right_start), tolerance):
+            errors.append(
+                f"vertical divider at x {x_start}..{x_end}, "
+                f"expected {left_end}..{right_start}"
+            )
+        if horizontal and _off((y_start, y_end), (top_end, bottom_start), tolerance):
+            errors.append(
+                f"horizontal divider at y {y_start}..{y_end}, "
+                f"expected {top_end}..{bottom_start}"
+            )
+    return errors
+
+
+def _off(actual: Tuple[int, int], expected: Tuple[int, int], tolerance: int) -> bool:
+    return any(abs(a - e) > tolerance for a, e in zip(actual, expected))
+
+
+def cases(composite: SyntheticComposite, jpeg_quality: int):
+    """(name suffix, image) for the lossless composite and its JPEG round trip."""
+    yield "", composite.image
+    ok, encoded = cv2.imencode(
+        ".jpg", composite.image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    )
+    if ok:
+        yield ".jpg", cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12])
+    parser.add_argument(
+        "--layouts", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS)
+    )
+    parser.add_argument("--seeds", type=int, default=2)
+    parser.add_argument("--jpeg-quality", type=int, default=85)
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=1,
+        help="Pixels a panel or divider edge may be off by.",
+    )
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="Race the speculative candidates instead of splitting sequentially.",
+    )
+    parser.add_argument("--config", type=str, default="config.yaml")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    log.setLevel(logging.INFO)
+
+    config = load_benchmark_config(args.config)
+    config.setdefault("speculative", {})["enabled"] = args.speculative
+    splitter = ImageSplitter(config)
+
+    checked, failed, wrong = 0, 0, []
+    for megapixels in args.sizes:
+        for layout in args.layouts:
+            for seed in range(args.seeds):
+                composite = make_composite(layout, megapixels, seed)
+                for suffix, image in cases(composite, args.jpeg_quality):
+                    name = f"{layout}@{megapixels:g}MP#{seed}{suffix}"
+                    result = split_image(image, name, splitter, config)
+                    checked += 1
+                    if not result.success:
+                        failed += 1
+                        log.info(f"{name:<36}{'failed':<34}")
+                        continue
+                    errors = geometry_errors(composite, result, args.tolerance)
+                    status = "ok" if not errors else "; ".join(errors)
+                    label = f"{result.strategy_used} {result.confidence:.2f}"
+                    log.info(f"{name:<36}{label:<34}{status}")
+                    if errors:
+                        wrong.append(name)
+
+    log.info(
+        f"\n{checked} splits: {checked - failed - len(wrong)} correct, "
+        f"{len(wrong)} wrong, {failed} failed."
+    )
+    if wrong:
+        log.error(f"Wrong split geometry: {', '.join(wrong)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
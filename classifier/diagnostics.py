@@ -1,6 +1,8 @@
 from enum import Enum, auto
+from typing import Optional
 import cv2
 import numpy as np
+from core.analysis import ImageAnalysis
 from core.data_models import Image
 
 
@@ -15,15 +17,16 @@ class ImageType(Enum):
     UNKNOWN = auto()
 
 
-def has_full_dividers(image: Image, config: dict) -> bool:
+def has_full_dividers(
+    image: Image, config: dict, analysis: Optional[ImageAnalysis] = None
+) -> bool:
     """
     Checks for the presence of strong horizontal and vertical divider lines
     using the Hough Line Transform.
     """
     cfg = config.get("classifier", {})
 
-    grayscale = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(grayscale, 50, 150, apertureSize=3)
+    edges = (analysis or ImageAnalysis(image)).edges(50, 150)
 
     lines = cv2.HoughLinesP(
         edges,
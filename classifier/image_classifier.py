@@ -1,9 +1,16 @@
 import logging
+from typing import List, Optional, Tuple
 import cv2
 import numpy as np
+from core.analysis import ImageAnalysis, scaled_size
 from core.data_models import Image
 from classifier.diagnostics import ImageType
 
+# A background blob: its centroid and its (x, y, w, h) bounding box.
+Blob = Tuple[Tuple[float, float], Tuple[int, int, int, int]]
+# Pixels sampled by the fast mode's colour variance estimate.
+FAST_VARIANCE_SAMPLES = 65536
+
 
 class ImageClassifier:
     """
@@ -14,75 +21,64 @@ class ImageClassifier:
     def __init__(self, config: dict):
         self.config = config.get("classifier", {})
 
-    def _get_background_mask(self, image: Image) -> np.ndarray:
+    def _get_background_mask(self, analysis: ImageAnalysis) -> np.ndarray:
         """
         Identifies the dominant background color from the corners and returns
         a binary mask of that background.
         """
-        h, w, _ = image.shape
-        margin = 15
-        # Sample all four corners to get a robust median background color
-        corners = np.array(
-            [
-                image[margin, margin],
-                image[margin, w - margin],
-                image[h - margin, margin],
-                image[h - margin, w - margin],
-            ]
-        )
-        bg_color = np.median(corners, axis=0)
-
-        # Define a color tolerance range
+        # The shared analysis samples all four corners for a robust median
+        # background color and builds the tolerance mask around it.
         tolerance = self.config.get("background_color_tolerance", 25)
-        lower_bound = np.maximum(0, bg_color - tolerance).astype(int)
-        upper_bound = np.minimum(255, bg_color + tolerance).astype(int)
+        return analysis.background_mask(tolerance)
 
-        # Create the binary mask
-        mask = cv2.inRange(image, lower_bound, upper_bound)
-        return mask
-
-    def _diagnose_structure(self, image: Image) -> ImageType:
+    def _diagnose_structure(self, analysis: ImageAnalysis) -> ImageType:
         """
         The core of the new classifier. It analyzes the connectivity of the
         background to determine if dividers are present.
         """
-        bg_mask = self._get_background_mask(image)
-
-        # 1. Clean up small noise in the background mask
-        closing_kernel_size = self.config.get("closing_kernel_size", 3)
-        closing_kernel = np.ones((closing_kernel_size, closing_kernel_size), np.uint8)
-        cleaned_mask = cv2.morphologyEx(bg_mask, cv2.MORPH_CLOSE, closing_kernel)
-
-        # 2. Erode the mask to break the thin divider connections
-        erosion_kernel_size = self.config.get("erosion_kernel_size", 15)
-        erosion_kernel = np.ones((erosion_kernel_size, erosion_kernel_size), np.uint8)
-        eroded_mask = cv2.erode(cleaned_mask, erosion_kernel, iterations=1)
-
-        # 3. Count the number of resulting distinct background blobs
-        contours, _ = cv2.findContours(
-            eroded_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
-
-        # Filter out tiny noise contours
-        min_area = eroded_mask.shape[0] * eroded_mask.shape[1] * 0.01
-        large_blobs = [c for c in contours if cv2.contourArea(c) > min_area]
+        # With 'pyramid_levels' set, the diagnosis runs on a downscaled copy
+        # with kernels shrunk to match. A preview decode is always coarse
+        # enough to classify, so it is used rather than the full image.
+        levels = max(self.config.get("pyramid_levels", 0), analysis.preview_levels)
+        analysis = analysis.downscaled(levels)
+        image = analysis.image
+        fast = self.config.get("mode", "exact") == "fast"
+        if fast:
+            large_blobs, mask_shape = self._find_background_blobs_fast(analysis)
+        else:
+            large_blobs, mask_shape = self._find_background_blobs(analysis)
         blob_count = len(large_blobs)
         logging.debug(
             f"Classifier: Found {blob_count} distinct background blobs after erosion."
         )
 
+        # Two blobs on either side of the centre mean a single divider.
+        single_divider = (
+            self._single_divider_type(large_blobs, mask_shape)
+            if blob_count == 2
+            else None
+        )
+
         # 4. Make the diagnosis based on the blob count
         if blob_count >= 4:
             logging.info(
                 "Classifier: Diagnosis is DIVIDERS_FULL (background is disconnected)."
             )
             return ImageType.DIVIDERS_FULL
+        elif single_divider is not None:
+            logging.info(
+                f"Classifier: Diagnosis is {single_divider.name} (background is split in two)."
+            )
+            return single_divider
         else:
             # If the background is still one piece, it's seamless.
             # Now we can use a simple check to see if it's uniform or complex.
-            if (
-                np.mean(np.std(image, axis=(0, 1))) < 20
-            ):  # Check overall image color variance
+            color_spread = (
+                _sampled_color_spread(image)
+                if fast
+                else np.mean(np.std(image, axis=(0, 1)))
+            )
+            if color_spread < 20:  # Check overall image color variance
                 logging.info(
                     "Classifier: Diagnosis is SEAMLESS_UNIFORM (background is connected)."
                 )
@@ -93,9 +89,150 @@ class ImageClassifier:
                 )
                 return ImageType.SEAMLESS_COMPLEX
 
-    def diagnose(self, image: Image) -> ImageType:
+    def _find_background_blobs(
+        self, analysis: ImageAnalysis
+    ) -> Tuple[List[Blob], Tuple[int, int]]:
         """
-        Public method to run the diagnostic pipeline.
+        The large background blobs left once the divider connections are
+        eroded away, and the shape of the mask they were found in.
+        """
+        scale = analysis.scale
+        bg_mask = self._get_background_mask(analysis)
+
+        # 1. Clean up small noise in the background mask
+        closing_kernel_size = self.config.get("closing_kernel_size", 3)
+        if scale > 1:
+            closing_kernel_size = scaled_size(closing_kernel_size, scale)
+        closing_kernel = np.ones((closing_kernel_size, closing_kernel_size), np.uint8)
+        cleaned_mask = cv2.morphologyEx(bg_mask, cv2.MORPH_CLOSE, closing_kernel)
+
+        # 2. Erode the mask to break the thin divider connections
+        erosion_kernel_size = self.config.get("erosion_kernel_size", 15)
+        if scale > 1:
+            erosion_kernel_size = scaled_size(erosion_kernel_size, scale)
+        erosion_kernel = np.ones((erosion_kernel_size, erosion_kernel_size), np.uint8)
+        eroded_mask = cv2.erode(cleaned_mask, erosion_kernel, iterations=1)
+
+        # 3. Count the number of resulting distinct background blobs
+        contours, _ = cv2.findContours(
+            eroded_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+
+        # Filter out tiny noise contours
+        min_area = eroded_mask.shape[0] * eroded_mask.shape[1] * 0.01
+        large_blobs = []
+        for contour in contours:
+            if cv2.contourArea(contour) > min_area:
+                m = cv2.moments(contour)
+                centroid = (m["m10"] / m["m00"], m["m01"] / m["m00"])
+                large_blobs.append((centroid, cv2.boundingRect(contour)))
+        return large_blobs, eroded_mask.shape
+
+    def _find_background_blobs_fast(
+        self, analysis: ImageAnalysis
+    ) -> Tuple[List[Blob], Tuple[int, int]]:
+        """
+        Like _find_background_blobs, on a background mask shrunk to about
+        'fast_mask_side' pixels along its long side. A cell of the shrunk mask
+        is background only if every pixel it covers is, so dividers of any
+        width survive the reduction. Blobs are counted with a single
+        connected-components pass instead of tracing their contours.
+        """
+        bg_mask = self._get_background_mask(analysis)
+        height, width = bg_mask.shape
+        factor = max(
+            1, -(-max(height, width) // self.config.get("fast_mask_side", 512))
+        )
+        if factor > 1:
+            # Erosion anchored at the top-left turns each pixel into the
+            # minimum of the factor x factor cell starting there.
+            cells = cv2.erode(
+                bg_mask, np.ones((factor, factor), np.uint8), anchor=(0, 0)
+            )
+            bg_mask = np.ascontiguousarray(cells[::factor, ::factor])
+        scale = analysis.scale * factor
+
+        # The closing fills holes only a few pixels wide, so on the shrunk
+        # mask its kernel normally becomes a single cell and it is skipped.
+        closing_kernel_size = scaled_size(
+            self.config.get("closing_kernel_size", 3), scale
+        )
+        if closing_kernel_size > 1:
+            closing_kernel = np.ones(
+                (closing_kernel_size, closing_kernel_size), np.uint8
+            )
+            bg_mask = cv2.morphologyEx(bg_mask, cv2.MORPH_CLOSE, closing_kernel)
+        erosion_kernel_size = scaled_size(
+            self.config.get("erosion_kernel_size", 15), scale
+        )
+        erosion_kernel = np.ones((erosion_kernel_size, erosion_kernel_size), np.uint8)
+        eroded_mask = cv2.erode(bg_mask, erosion_kernel, iterations=1)
+
+        # Exact mode only sees outer contours, so blobs lying in the holes of
+        # another blob (background-coloured patches inside a panel) must not
+        # count. Filling every hole merges them into the blob around them and
+        # makes each component's area the area inside its outline, which is
+        # what contourArea measures.
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(
+            _fill_holes(eroded_mask), connectivity=8
+        )
+        min_area = eroded_mask.shape[0] * eroded_mask.shape[1] * 0.01
+        large_blobs = []
+        for label in range(1, count):  # label 0 is everything but background
+            if stats[label, cv2.CC_STAT_AREA] > min_area:
+                x, y, w, h = (int(v) for v in stats[label, :4])
+                centroid = (float(centroids[label][0]), float(centroids[label][1]))
+                large_blobs.append((centroid, (x, y, w, h)))
+        return large_blobs, eroded_mask.shape
+
+    def _single_divider_type(
+        self, blobs: List[Blob], shape: Tuple[int, int]
+    ) -> Optional[ImageType]:
+        """
+        Given exactly two background blobs, returns DIVIDERS_VERTICAL_ONLY if
+        they sit left and right of the image centre, DIVIDERS_HORIZONTAL_ONLY
+        if they sit above and below it, and None otherwise.
+        """
+        height, width = shape
+        ((x0, y0), _), ((x1, y1), _) = blobs
+        # The blobs are split along the direction in which their centroids lie
+        # furthest apart, and the gap between them must cross the centre.
+        vertical = abs(x1 - x0) / width >= abs(y1 - y0) / height
+        i = 0 if vertical else 1  # x or y in an (x, y, w, h) rectangle
+        center = width / 2 if vertical else height / 2
+        first, second = sorted((rect for _, rect in blobs), key=lambda r: r[i])
+        if not first[i] + first[i + 2] <= center <= second[i]:
+            return None
+        if vertical:
+            return ImageType.DIVIDERS_VERTICAL_ONLY
+        return ImageType.DIVIDERS_HORIZONTAL_ONLY
+
+    def diagnose(
+        self, image: Optional[Image], analysis: Optional[ImageAnalysis] = None
+    ) -> ImageType:
+        """
+        Public method to run the diagnostic pipeline. Pass the image's shared
+        ImageAnalysis to reuse derived arrays computed by other stages.
         """
         # This new method is robust enough to be the only check we need.
-        return self._diagnose_structure(image)
+        return self._diagnose_structure(analysis or ImageAnalysis(image))
+
+
+def _sampled_color_spread(image: Image) -> float:
+    """
+    Estimates np.mean(np.std(image, axis=(0, 1))) from a regular grid of
+    about FAST_VARIANCE_SAMPLES pixels instead of every pixel.
+    """
+    height, width = image.shape[:2]
+    stride = max(1, int(np.sqrt(height * width / FAST_VARIANCE_SAMPLES)))
+    sample = np.ascontiguousarray(image[::stride, ::stride])
+    _, std = cv2.meanStdDev(sample)
+    return float(np.mean(std))
+
+
+def _fill_holes(mask: Image) -> Image:
+    """'mask' with every region of zeros that does not touch the border set."""
+    # Flood the zeros reachable from outside through a one-pixel frame.
+    outside = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(outside, None, (0, 0), 255)
+    return mask | cv2.bitwise_not(outside[1:-1, 1:-1])
@@ -0,0 +1,188 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from core.data_models import Image, StrategyAttempt
+from utils.profile_utils import ProjectionProfiles
+
+# Inset from the image border used when sampling the corner background colour.
+BACKGROUND_SAMPLE_MARGIN = 15
+# Pyramid levels are never made smaller than this along their short side.
+PYRAMID_MIN_SIDE = 128
+
+
+def scaled_size(size: int, scale: int, odd: bool = False) -> int:
+    """
+    Shrinks a full-resolution length (e.g. a kernel size) for use on a pyramid
+    level that is 'scale' times smaller, keeping it at least 1 (or 3 and odd
+    when 'odd' is set, as adaptive threshold block sizes must be).
+    """
+    scaled = max(1, int(round(size / scale)))
+    if odd:
+        scaled = max(3, scaled | 1)
+    return scaled
+
+
+class ImageAnalysis:
+    """
+    Per-image context shared by the classifier, the strategies and the
+    post-processor.
+
+    Derived arrays (grayscale, background colour and mask, edge maps) are
+    computed lazily the first time they are requested and then reused, so
+    each full-frame pass happens at most once per image no matter how many
+    stages need it. The context is safe to share between threads.
+
+    The splitter also uses it to memoize strategy results, and records every
+    strategy run in 'attempts'.
+    """
+
+    def __init__(self, image: Union[Image, "Future[Image]"], scale: int = 1):
+        # May be a Future while the full-resolution decode is still running.
+        self._image = image
+        # How many times smaller than the original this image is.
+        self.scale = scale
+        # Pyramid levels served from a reduced decode; see use_preview.
+        self.preview_levels = 0
+        self.attempts: List[StrategyAttempt] = []
+        # What every strategy run on the image asked to draw; see
+        # SplitResult.debug_artifacts.
+        self.debug_artifacts: Dict[str, Any] = {}
+        self._memo: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def image(self) -> Image:
+        """The image, waiting for its decode to finish if necessary."""
+        if isinstance(self._image, Future):
+            image = self._image.result()
+            if image is None:
+                raise ValueError("Failed to decode the full-resolution image.")
+            self._image = image
+        return self._image
+
+    def use_preview(self, preview: Image, levels: int):
+        """
+        Registers a reduced-resolution decode of the image, 2 ** 'levels' times
+        smaller, as its pyramid level 'levels'. downscaled() builds that level
+        and every coarser one from the preview, so classification and coarse
+        searches at least that deep run without waiting for the full image.
+        """
+        self.preview_levels = levels
+        self._memo[("pyramid", levels)] = ImageAnalysis(preview, scale=2**levels)
+
+    def memoize(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the value stored under 'key', calling 'compute' to produce it
+        the first time. Concurrent callers asking for the same key wait for a
+        single computation; different keys are computed in parallel.
+        """
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    def record_attempt(
+        self, attempt: StrategyAttempt, debug_artifacts: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Appends a strategy run to 'attempts' and merges what it asked to draw
+        into 'debug_artifacts'. A strategy already recorded is not recorded
+        again, so reusing a memoized result leaves the chain unchanged.
+        """
+        with self._lock:
+            if any(a.strategy == attempt.strategy for a in self.attempts):
+                return
+            self.attempts.append(attempt)
+            self.debug_artifacts.update(debug_artifacts or {})
+
+    @property
+    def gray(self) -> Image:
+        """The grayscale version of the full image."""
+        return self.memoize(
+            "gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        )
+
+    @property
+    def background_color(self) -> np.ndarray:
+        """
+        The median of four pixels sampled just inside the image corners, as a
+        float BGR triple.
+        """
+
+        def compute():
+            h, w, _ = self.image.shape
+            # Pyramid levels sample at the same position in the original.
+            margin = max(1, BACKGROUND_SAMPLE_MARGIN // self.scale)
+            corners = np.array(
+                [
+                    self.image[margin, margin],
+                    self.image[margin, w - margin],
+                    self.image[h - margin, margin],
+                    self.image[h - margin, w - margin],
+                ]
+            )
+            return np.median(corners, axis=0)
+
+        return self.memoize("background_color", compute)
+
+    def background_mask(self, tolerance: int) -> Image:
+        """A binary mask of the pixels within 'tolerance' of the background colour."""
+
+        def compute():
+            bg_color = self.background_color
+            lower_bound = np.maximum(0, bg_color - tolerance).astype(int)
+            upper_bound = np.minimum(255, bg_color + tolerance).astype(int)
+            return cv2.inRange(self.image, lower_bound, upper_bound)
+
+        return self.memoize(("background_mask", tolerance), compute)
+
+    def edges(self, low: int, high: int) -> Image:
+        """The Canny edge map of the full grayscale image."""
+        return self.memoize(
+            ("edges", low, high),
+            lambda: cv2.Canny(self.gray, low, high, apertureSize=3),
+        )
+
+    @property
+    def profiles(self) -> ProjectionProfiles:
+        """Row/column sum and sum-of-squares profiles of the grayscale image."""
+        return self.memoize("profiles", lambda: ProjectionProfiles(self.gray))
+
+    def downscaled(self, levels: int) -> "ImageAnalysis":
+        """
+        The analysis of a Gaussian pyramid level 'levels' steps down, each step
+        halving both sides. Fewer levels are used if the short side would drop
+        below PYRAMID_MIN_SIDE; with no levels this analysis itself is
+        returned. Levels at least as deep as a preview registered with
+        use_preview start from the preview, finer ones from the full image.
+        Check 'scale' on the result for the factor actually used.
+        """
+        if self.preview_levels and levels >= self.preview_levels:
+            depth = self.preview_levels
+            level = self._memo[("pyramid", depth)]
+        else:
+            depth, level = 0, self
+        while depth < levels and min(level.image.shape[:2]) // 2 >= PYRAMID_MIN_SIDE:
+            depth += 1
+            parent = level
+            level = self.memoize(
+                ("pyramid", depth),
+                lambda: ImageAnalysis(
+                    cv2.pyrDown(parent.image), scale=parent.scale * 2
+                ),
+            )
+        return level
+
+    def gray_region(self, rect: Tuple[int, int, int, int]) -> Image:
+        """The grayscale view of an (x, y, w, h) region, e.g. one panel."""
+        x, y, w, h = rect
+        return self.gray[y : y + h, x : x + w]
@@ -0,0 +1,317 @@
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+import cv2
+
+from core.data_models import BatchSummary, ImageOutcome, InputFile
+from core.image_splitter import ImageSplitter
+from core.processing import configure_threads, open_input, process_image
+from core.result_cache import ResultCache
+from utils import tracing
+from utils.debug_utils import DebugArtifactWriter
+from utils.logging_config import setup_logging
+
+# Per-process state, populated once by the pool initializer so every worker
+# keeps a single warm ImageSplitter for its whole lifetime.
+_worker_splitter: Optional[ImageSplitter] = None
+_worker_config: Optional[dict] = None
+_worker_output_dir: Optional[str] = None
+_worker_cache: Optional[ResultCache] = None
+_worker_debug_writer: Optional[DebugArtifactWriter] = None
+_worker_geometry_only = False
+
+
+def _init_worker(config: dict, output_dir: str, geometry_only: bool = False):
+    global _worker_splitter, _worker_config, _worker_output_dir, _worker_cache
+    global _worker_debug_writer, _worker_geometry_only
+    setup_logging(debug=config.get("debug_mode", False))
+    # Shutdown is driven by the parent; a Ctrl-C must not kill workers mid-image.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The pool already saturates the cores; stop OpenCV from oversubscribing them.
+    cv2.setNumThreads(1)
+    configure_threads(config, pool_worker=True)
+    _worker_config = config
+    _worker_output_dir = output_dir
+    _worker_splitter = ImageSplitter(config)
+    _worker_cache = ResultCache.from_config(config)
+    _worker_debug_writer = DebugArtifactWriter.from_config(config)
+    if _worker_debug_writer is not None:
+        _worker_debug_writer.close_at_exit()
+    _worker_geometry_only = geometry_only
+
+
+def _run_in_worker(item: InputFile) -> ImageOutcome:
+    assert _worker_splitter is not None and _worker_config is not None
+    return process_file(
+        item,
+        _worker_splitter,
+        _worker_config,
+        _worker_output_dir or "",
+        _worker_cache,
+        _worker_geometry_only,
+        _worker_debug_writer,
+    )
+
+
+def process_file(
+    item: InputFile,
+    splitter: ImageSplitter,
+    config: dict,
+    output_dir: str,
+    cache: Optional[ResultCache] = None,
+    geometry_only: bool = False,
+    debug_writer: Optional[DebugArtifactWriter] = None,
+) -> ImageOutcome:
+    """
+    Loads, splits and saves one input file. Any error is captured in the
+    returned outcome so a single bad image never takes down the batch. With
+    'geometry_only' no panels are written; the outcome carries the geometry.
+    When tracing is enabled, the outcome also carries the timed stages.
+    """
+    trace = tracing.start_trace(config, item.name)
+    with tracing.activate(trace), tracing.span("image"):
+        outcome = _process_file(
+            item, splitter, config, output_dir, cache, geometry_only, debug_writer
+        )
+    if trace is not None:
+        outcome.spans = trace.spans
+    return outcome
+
+
+def _process_file(
+    item: InputFile,
+    splitter: ImageSplitter,
+    config: dict,
+    output_dir: str,
+    cache: Optional[ResultCache],
+    geometry_only: bool,
+    debug_writer: Optional[DebugArtifactWriter] = None,
+) -> ImageOutcome:
+    start = time.perf_counter()
+    logging.info(f"--- Processing image: {item.name} ---")
+    try:
+        preview_reduction = config.get("input", {}).get("preview_reduction", 1)
+        analysis, cache_key = open_input(item.path, cache, preview_reduction)
+        if analysis is None:
+            return ImageOutcome(
+                name=item.name,
+                success=False,
+                error_message="Failed to load image.",
+                source=item.path,
+                elapsed=time.perf_counter() - start,
+            )
+
+        result = process_image(
+            None,
+            item.name,
+            splitter,
+            config,
+            output_dir,
+            cache,
+            cache_key,
+            analysis,
+            geometry_only,
+            debug_writer,
+        )
+        height, width = analysis.image.shape[:2]
+        return ImageOutcome(
+            name=item.name,
+            success=result.success,
+            strategy_used=result.strategy_used,
+            confidence=result.confidence,
+            error_message=result.error_message,
+            elapsed=time.perf_counter() - start,
+            cache_hit=result.cached,
+            attempts=result.attempts,
+            source=item.path,
+            image_size=(width, height),
+            panel_rects=result.panel_rects,
+            divider_bounds=result.divider_bounds,
+        )
+    except Exception as e:
+        logging.error(f"Unexpected error while processing {item.name}: {e}")
+        return ImageOutcome(
+            name=item.name,
+            success=False,
+            error_message=str(e),
+            elapsed=time.perf_counter() - start,
+            source=item.path,
+        )
+
+
+class BatchProcessor:
+    """
+    Runs the splitter over a stream of input files, either in-process or on a
+    pool of worker processes.
+
+    Inputs are consumed lazily and at most 'max_pending' images are in flight
+    at once, so arbitrarily large (or endless) input streams run in constant
+    memory. Outcomes are yielded in input order when 'ordered' is set,
+    otherwise as soon as each image completes. With 'geometry_only', no
+    panels are written and the outcomes carry the split geometry instead.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        output_dir: str,
+        workers: int = 1,
+        ordered: bool = False,
+        max_pending: Optional[int] = None,
+        geometry_only: bool = False,
+    ):
+        self.config = config
+        self.output_dir = output_dir
+        self.geometry_only = geometry_only
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.ordered = ordered
+        self.max_pending = max_pending or self.workers * 2
+
+    def run(self, inputs: Iterable[InputFile]) -> Iterator[ImageOutcome]:
+        """Yields an ImageOutcome for every input file."""
+        if self.workers == 1:
+            return self._run_sequential(inputs)
+        return self._run_parallel(inputs)
+
+    def process(
+        self,
+        inputs: Iterable[InputFile],
+        on_outcome: Optional[Callable[[ImageOutcome], None]] = None,
+    ) -> BatchSummary:
+        """Processes every input file and returns the aggregated summary."""
+        return summarize(self.run(inputs), on_outcome)
+
+    def _run_sequential(self, inputs: Iterable[InputFile]) -> Iterator[ImageOutcome]:
+        configure_threads(self.config)
+        splitter = ImageSplitter(self.config)
+        cache = ResultCache.from_config(self.config)
+        debug_writer = DebugArtifactWriter.from_config(self.config)
+        try:
+            for item in inputs:
+                yield process_file(
+                    item,
+                    splitter,
+                    self.config,
+                    self.output_dir,
+                    cache,
+                    self.geometry_only,
+                    debug_writer,
+                )
+        finally:
+            if debug_writer is not None:
+                debug_writer.close()
+
+    def _run_parallel(self, inputs: Iterable[InputFile]) -> Iterator[ImageOutcome]:
+        logging.info(f"Starting process pool with {self.workers} workers.")
+        slots = threading.Semaphore(self.max_pending)
+        events: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        feed_error: list = []
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.config, self.output_dir, self.geometry_only),
+        )
+
+        def feed():
+            # Runs on its own thread so a slow or blocking input iterator never
+            # delays the collection of finished results.
+            submitted = 0
+            try:
+                for item in inputs:
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    future = executor.submit(_run_in_worker, item)
+                    submitted += 1
+                    if self.ordered:
+                        events.put((item, future))
+                    else:
+                        future.add_done_callback(
+                            lambda f, item=item: events.put((item, f))
+                        )
+            except Exception as e:
+                feed_error.append(e)
+            finally:
+                events.put(submitted)
+
+        feeder = threading.Thread(target=feed, name="batch-feeder", daemon=True)
+        feeder.start()
+
+        submitted: Optional[int] = None
+        received = 0
+        try:
+            while submitted is None or received < submitted:
+                event = events.get()
+                if isinstance(event, int):
+                    submitted = event
+                    continue
+                item, future = event
+                received += 1
+                slots.release()
+                yield self._collect(item, future)
+        finally:
+            stop.set()
+            slots.release()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if feed_error:
+            raise feed_error[0]
+
+    @staticmethod
+    def _collect(item: InputFile, future: Future) -> ImageOutcome:
+        try:
+            return future.result()
+        except Exception as e:
+            # The worker itself died (e.g. killed by the OOM killer).
+            logging.error(f"Worker failed while processing {item.name}: {e}")
+            return ImageOutcome(
+                name=item.name, success=False, error_message=str(e), source=item.path
+            )
+
+
+def summarize(
+    outcomes: Iterable[ImageOutcome],
+    on_outcome: Optional[Callable[[ImageOutcome], None]] = None,
+) -> BatchSummary:
+    """Drains a stream of outcomes into a BatchSummary."""
+    summary = BatchSummary()
+    start = time.perf_counter()
+    for outcome in outcomes:
+        summary.record(outcome)
+        if on_outcome:
+            on_outcome(outcome)
+    summary.elapsed = time.perf_counter() - start
+    return summary
+
+
+def log_summary(summary: BatchSummary):
+    """Logs a human-readable summary of a finished batch."""
+    rate = summary.total / summary.elapsed if summary.elapsed > 0 else 0.0
+    logging.info(
+        f"Batch complete: {summary.succeeded}/{summary.total} images split, "
+        f"{summary.failed} failed in {summary.elapsed:.1f}s ({rate:.2f} images/s)."
+    )
+    if summary.cache_hits:
+        logging.info(
+            f"Result cache: {summary.cache_hits} hits, "
+            f"{summary.total - summary.cache_hits} misses."
+        )
+    for strategy, count in sorted(summary.strategy_counts.items()):
+        logging.info(f"  {strategy}: {count}")
+    if summary.attempt_stats:
+        logging.info("Strategy attempts:")
+        for strategy, (runs, seconds) in sorted(summary.attempt_stats.items()):
+            logging.info(
+                f"  {strategy}: {int(runs)} runs, "
+                f"{seconds / runs * 1000:.1f} ms average"
+            )
+    for failure in summary.failures:
+        logging.error(f"  FAILED {failure.name}: {failure.error_message}")
@@ -5,6 +5,30 @@ import numpy as np
 Image = np.ndarray
 
 
+@dataclass
+class StrategyAttempt:
+    """One run of a strategy against an image, as recorded by the splitter."""
+
+    strategy: str
+    success: bool
+    confidence: float
+    elapsed: float
+    error_message: Optional[str] = None
+
+
+@dataclass
+class TraceSpan:
+    """The wall and CPU time of one stage of work on an image (see utils.tracing)."""
+
+    name: str
+    # time.perf_counter() at the start of the span.
+    start: float
+    wall: float
+    cpu: float
+    pid: int
+    thread: int
+
+
 @dataclass
 class SplitResult:
     """
@@ -16,7 +40,88 @@ class SplitResult:
     confidence: float
     images: Optional[List[Image]] = None
     # --- THE UPGRADE: Add a definitive list of content bounds ---
-    # Each tuple is (x, y, w, h) relative to the full original image.
+    # The (x, y, w, h) box of each panel's content, relative to the panel.
+    # The strategies leave them as (0, 0, 0, 0): content bounds are measured
+    # once, in post-processing, and only for panels that are standardized.
     bounds: Optional[List[Tuple[int, int, int, int]]] = None
+    # The (x, y, w, h) rectangle each panel was cropped from in the original
+    # image, and the (x_start, x_end, y_start, y_end) extent of the dividers.
+    # Together they are enough to reproduce the split without re-analysis.
+    panel_rects: Optional[List[Tuple[int, int, int, int]]] = None
+    divider_bounds: Optional[Tuple[int, int, int, int]] = None
+    # True when the geometry was restored from the ResultCache.
+    cached: bool = False
     error_message: Optional[str] = None
+    # In debug mode, what to draw for this image: artifact kind (e.g.
+    # "projection") -> the arguments of its drawer in utils.debug_utils.
+    # The final result carries those of every strategy that ran.
     debug_artifacts: Dict[str, Any] = field(default_factory=dict)
+    # Every strategy run for this image, in the order they were attempted.
+    attempts: List[StrategyAttempt] = field(default_factory=list)
+
+
+@dataclass
+class InputFile:
+    """
+    An image queued for processing. 'name' is the path relative to the input
+    root and is used to name the outputs.
+    """
+
+    path: str
+    name: str
+
+
+@dataclass
+class ImageOutcome:
+    """
+    The per-image record produced by the batch engine. It is deliberately free
+    of pixel data so it can be cheaply returned from worker processes.
+    """
+
+    name: str
+    success: bool
+    strategy_used: Optional[str] = None
+    confidence: float = 0.0
+    error_message: Optional[str] = None
+    elapsed: float = 0.0
+    cache_hit: bool = False
+    attempts: List[StrategyAttempt] = field(default_factory=list)
+    # The input's path, so the journal can retry it, and the split geometry,
+    # for geometry-only manifests (see core.journal and core.manifest).
+    source: Optional[str] = None
+    image_size: Optional[Tuple[int, int]] = None
+    panel_rects: Optional[List[Tuple[int, int, int, int]]] = None
+    divider_bounds: Optional[Tuple[int, int, int, int]] = None
+    # Timed stages, when tracing is enabled.
+    spans: List[TraceSpan] = field(default_factory=list)
+
+
+@dataclass
+class BatchSummary:
+    """Aggregated statistics for a batch run."""
+
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    cache_hits: int = 0
+    elapsed: float = 0.0
+    strategy_counts: Dict[str, int] = field(default_factory=dict)
+    # Strategy name -> [number of runs, total seconds], across all images.
+    attempt_stats: Dict[str, List[float]] = field(default_factory=dict)
+    failures: List[ImageOutcome] = field(default_factory=list)
+
+    def record(self, outcome: ImageOutcome):
+        self.total += 1
+        if outcome.cache_hit:
+            self.cache_hits += 1
+        for attempt in outcome.attempts:
+            stats = self.attempt_stats.setdefault(attempt.strategy, [0, 0.0])
+            stats[0] += 1
+            stats[1] += attempt.elapsed
+        if outcome.success:
+            self.succeeded += 1
+            strategy = outcome.strategy_used or "unknown"
+            self.strategy_counts[strategy] = self.strategy_counts.get(strategy, 0) + 1
+        else:
+            self.failed += 1
+            self.failures.append(outcome)
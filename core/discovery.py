@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+import sys
+from fnmatch import fnmatchcase
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+from core.data_models import InputFile
+
+DEFAULT_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tiff")
+
+
+def matches_any(path: str, patterns: Optional[Sequence[str]]) -> bool:
+    return bool(patterns) and any(fnmatchcase(path, p) for p in patterns or ())
+
+
+def discover_inputs(
+    root: str,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+) -> Iterator[InputFile]:
+    """
+    Streams the images under 'root' as they are found, without ever listing a
+    whole directory or tree up front.
+
+    Glob patterns are matched against the '/'-separated path relative to
+    'root'. A file is yielded when it has one of 'extensions', matches at
+    least one 'include' pattern (if any are given) and no 'exclude' pattern.
+    Excluded directories are not descended into.
+    """
+    extensions = tuple(e.lower() for e in extensions)
+    # (directory, its path relative to root) pairs still to be scanned
+    pending_dirs = [(root, "")]
+    while pending_dirs:
+        directory, rel_dir = pending_dirs.pop()
+        try:
+            scanner = os.scandir(directory)
+        except OSError as e:
+            logging.warning(f"Cannot read directory {directory}: {e}")
+            continue
+        with scanner:
+            for entry in scanner:
+                rel_path = rel_dir + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    if recursive and not matches_any(rel_path, exclude):
+                        pending_dirs.append((entry.path, rel_path + "/"))
+                    continue
+                if not entry.name.lower().endswith(extensions):
+                    continue
+                if include and not matches_any(rel_path, include):
+                    continue
+                if matches_any(rel_path, exclude):
+                    continue
+                yield InputFile(path=entry.path, name=rel_path)
+
+
+def read_path_list(source: str, root: Optional[str] = None) -> Iterator[InputFile]:
+    """
+    Streams the images listed one per line in a file, or on stdin when
+    'source' is '-'. Relative paths are resolved against 'root'. Paths inside
+    'root' (or, without one, the working directory) keep their relative name
+    so the outputs mirror the input tree; anything else is named after its
+    whole absolute path, so that no two listed files share a name.
+    """
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for line in stream:
+            path = line.strip()
+            if not path or path.startswith("#"):
+                continue
+            if root and not os.path.isabs(path):
+                path = os.path.join(root, path)
+            yield InputFile(path=path, name=_listed_name(path, root or os.curdir))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _listed_name(path: str, root: str) -> str:
+    """The output name of a listed path: relative to 'root' if inside it."""
+    absolute = os.path.abspath(path)
+    rel_path = os.path.relpath(absolute, os.path.abspath(root))
+    if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+        # e.g. /data/a/x.png -> data/a/x.png
+        drive, rel_path = os.path.splitdrive(absolute)
+        rel_path = drive.replace(":", "") + rel_path
+    return rel_path.lstrip(os.sep).replace(os.sep, "/")
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parses an 'INDEX/COUNT' shard spec, where INDEX runs from 0 to COUNT - 1."""
+    try:
+        index_text, count_text = spec.split("/")
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected INDEX/COUNT, e.g. 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}': INDEX must be in [0, COUNT).")
+    return index, count
+
+
+def shard_of(name: str, count: int) -> int:
+    """
+    Maps a relative input path to a shard. The hash is content-based (not
+    Python's per-process salted hash()), so every node computes the same
+    assignment without any coordination.
+    """
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def shard_inputs(
+    inputs: Iterable[InputFile], index: int, count: int
+) -> Iterator[InputFile]:
+    """Keeps only the inputs that belong to shard 'index' of 'count'."""
+    for item in inputs:
+        if shard_of(item.name, count) == index:
+            yield item
@@ -1,12 +1,20 @@
 import logging
 import importlib
-from core.data_models import SplitResult, Image
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from core.analysis import ImageAnalysis
+from core.data_models import SplitResult, StrategyAttempt, Image
+from utils.tracing import bound, span
 
 
 class ImageSplitter:
     def __init__(self, config: dict):
         self.config = config
         self.strategies = self._load_strategies()
+        self._speculative_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
 
     def _load_strategies(self) -> dict:
         loaded_strategies = {}
@@ -19,7 +27,7 @@ class ImageSplitter:
                 )
                 module = importlib.import_module(f"strategies.{name}")
                 StrategyClass = getattr(module, class_name)
-                strategy_config = self.config.get(name, {})
+                strategy_config = dict(self.config.get(name, {}))
                 if "projection_profile" in name:
                     strategy_config.update(self.config.get("projection_profile", {}))
                 loaded_strategies[name] = StrategyClass(
@@ -36,8 +44,117 @@ class ImageSplitter:
             logging.error(f"Attempted to get non-existent strategy: '{name}'")
         return strategy
 
-    def run_full_pipeline(self, image: Image, filename: str) -> SplitResult:
+    def run_strategy(
+        self,
+        name: str,
+        image: Image,
+        filename: str,
+        analysis: ImageAnalysis,
+        record: bool = True,
+    ) -> Optional[SplitResult]:
+        """
+        Runs a strategy at most once per image: the result is memoized on the
+        image's analysis, so later requests for the same strategy (e.g. from
+        the fallback pipeline) reuse it instead of re-running it.
+
+        With 'record', the run is added to the analysis's attempt chain (once,
+        however often it is requested); speculative runs pass False and are
+        recorded only if their result is actually considered.
+        """
+        strategy = self.get_strategy(name)
+        if not strategy:
+            return None
+
+        def attempt() -> Tuple[SplitResult, StrategyAttempt]:
+            start = time.perf_counter()
+            with span(f"strategy.{name}"):
+                result = strategy.split(image, filename, analysis)
+            return result, StrategyAttempt(
+                strategy=name,
+                success=result.success,
+                confidence=result.confidence,
+                elapsed=time.perf_counter() - start,
+                error_message=result.error_message,
+            )
+
+        result, run = analysis.memoize(("strategy", name), attempt)
+        if record:
+            analysis.record_attempt(run, result.debug_artifacts)
+        return result
+
+    def speculative_candidates(self, preferred: Optional[str] = None) -> List[str]:
+        """
+        The strategies to race when speculative mode is enabled, in priority
+        order, or an empty list when it is disabled. 'preferred' (typically the
+        classifier's pick) is moved to the front.
+        """
+        cfg = self.config.get("speculative", {})
+        if not cfg.get("enabled", False):
+            return []
+        names = [n for n in cfg.get("candidates", []) if n in self.strategies]
+        if preferred in self.strategies:
+            names = [preferred] + [n for n in names if n != preferred]
+        return names
+
+    def run_speculative(
+        self, names: List[str], image: Image, filename: str, analysis: ImageAnalysis
+    ) -> Optional[SplitResult]:
+        """
+        Runs the named strategies concurrently and returns the result of the
+        highest-priority one that clears its confidence threshold, or None.
+
+        At most 'speculative.parallel' candidates of the image run at once:
+        the one being waited for and those right behind it. Lower-priority
+        results are only accepted once every strategy ahead of them has
+        finished without an acceptable result. Once a winner is known, no
+        further candidates are started and those still queued behind other
+        images' work are cancelled; those already running finish in the
+        background and are ignored. Only the strategies considered up to the
+        winner appear in the attempt chain.
+        """
+        cfg = self.config.get("speculative", {})
+        parallel = max(1, cfg.get("parallel", 2))
+        pool = self._get_speculative_pool()
+        futures: Dict[str, Future] = {}
+        logging.info(f"Speculatively running strategies: {names}")
+        for index, name in enumerate(names):
+            for queued in names[index : index + parallel]:
+                if queued not in futures:
+                    futures[queued] = pool.submit(
+                        bound(self.run_strategy),
+                        queued,
+                        image,
+                        filename,
+                        analysis,
+                        False,
+                    )
+            futures[name].result()
+            # Memoized by now; this records the run in priority order.
+            result = self.run_strategy(name, image, filename, analysis)
+            threshold = self.config.get(name, {}).get("confidence_threshold", 0.8)
+            if result is not None and result.success and result.confidence >= threshold:
+                for future in futures.values():
+                    if not future.done():
+                        future.cancel()
+                return result
+        return None
+
+    def _get_speculative_pool(self) -> ThreadPoolExecutor:
+        # Created on first use and shared by every image this splitter handles.
+        with self._pool_lock:
+            if self._speculative_pool is None:
+                cfg = self.config.get("speculative", {})
+                workers = cfg.get("max_workers") or len(cfg.get("candidates", [])) or 1
+                self._speculative_pool = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="speculative"
+                )
+            return self._speculative_pool
+
+    def run_full_pipeline(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         """Runs the linear failover pipeline, passing filename for debugging."""
+        analysis = analysis or ImageAnalysis(image)
         fallback_order = ["contour_analysis", "midpoint_fallback"]
         for name in fallback_order:
             strategy = self.get_strategy(name)
@@ -47,8 +164,10 @@ class ImageSplitter:
             logging.info(
                 f"Fallback Pipeline: Attempting strategy: {strategy.__class__.__name__}"
             )
-            # --- FIX: Pass 'filename' to the split method ---
-            result = strategy.split(image, filename)
+            # Reuses the result if this strategy already ran on the image
+            result = self.run_strategy(name, image, filename, analysis)
+            if result is None:
+                continue
 
             threshold = self.config.get(name, {}).get("confidence_threshold", 0.8)
             if result.success and result.confidence >= threshold:
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Iterator, List
+
+from core.data_models import ImageOutcome, InputFile
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class ProgressJournal:
+    """
+    An append-only JSONL journal with one line per finished image.
+
+    Every record is flushed (and by default fsync'ed) as soon as the image
+    completes, so after a crash the journal holds everything that was
+    finished up to that point. At most the final line can be torn; it is
+    ignored when the journal is read back. When an image appears more than
+    once, its latest record wins, which is how retried failures are marked
+    as done.
+    """
+
+    def __init__(self, path: str, resume: bool = False, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        # Latest status per image name; makes the resume check O(1) per file.
+        self.statuses: Dict[str, str] = {}
+        # Where each image was read from, so failures can be retried.
+        self.paths: Dict[str, str] = {}
+
+        journal_dir = os.path.dirname(path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+        if resume:
+            for entry in iter_journal(path):
+                self.statuses[entry["name"]] = entry["status"]
+                if entry.get("path"):
+                    self.paths[entry["name"]] = entry["path"]
+            logging.info(
+                f"Resuming from journal {path}: {len(self.completed())} done, "
+                f"{len(self.failed())} failed."
+            )
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0 and not _ends_with_newline(path):
+            # Seal a line torn by a crash so the next record starts cleanly.
+            self._file.write("\n")
+
+    def is_completed(self, name: str) -> bool:
+        return self.statuses.get(name) == STATUS_DONE
+
+    def completed(self) -> List[str]:
+        return [n for n, s in self.statuses.items() if s == STATUS_DONE]
+
+    def failed(self) -> List[str]:
+        return [n for n, s in self.statuses.items() if s == STATUS_FAILED]
+
+    def pending(self, inputs: Iterable[InputFile]) -> Iterator[InputFile]:
+        """Filters out the inputs that already completed successfully."""
+        skipped = 0
+        for item in inputs:
+            if self.is_completed(item.name):
+                skipped += 1
+                continue
+            yield item
+        if skipped:
+            logging.info(f"Skipped {skipped} images already completed in the journal.")
+
+    def failed_inputs(self, input_dir: str) -> Iterator[InputFile]:
+        """
+        Yields the inputs whose latest journal record is a failure, read from
+        the path they were recorded with. Records written before paths were
+        journaled are looked up under 'input_dir' by name.
+        """
+        for name in self.failed():
+            path = self.paths.get(name) or os.path.join(input_dir, name)
+            yield InputFile(path=path, name=name)
+
+    def record(self, outcome: ImageOutcome):
+        entry = {
+            "name": outcome.name,
+            "path": outcome.source,
+            "status": STATUS_DONE if outcome.success else STATUS_FAILED,
+            "strategy_used": outcome.strategy_used,
+            "confidence": outcome.confidence,
+            "error_message": outcome.error_message,
+            "elapsed": round(outcome.elapsed, 4),
+            "attempts": [
+                {
+                    "strategy": a.strategy,
+                    "success": a.success,
+                    "confidence": round(a.confidence, 4),
+                    "elapsed": round(a.elapsed, 4),
+                }
+                for a in outcome.attempts
+            ],
+            "timestamp": time.time(),
+        }
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.statuses[outcome.name] = entry["status"]
+        if outcome.source:
+            self.paths[outcome.name] = outcome.source
+
+    def close(self):
+        self._file.close()
+
+
+def iter_journal(path: str) -> Iterator[dict]:
+    """Yields the records of a journal in the order they were written."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(
+                    f"Ignoring unreadable journal line {line_number} in {path}."
+                )
+                continue
+            yield entry
+
+
+def merge_journals(paths: List[str]) -> dict:
+    """
+    Combines the journals written by several nodes (or several runs) into one
+    report. When an image appears in more than one journal, the most recent
+    record wins.
+    """
+    latest: Dict[str, dict] = {}
+    per_journal: Dict[str, int] = {}
+    for path in paths:
+        count = 0
+        for entry in iter_journal(path):
+            count += 1
+            previous = latest.get(entry["name"])
+            if previous is None or entry["timestamp"] >= previous["timestamp"]:
+                latest[entry["name"]] = entry
+        per_journal[path] = count
+
+    strategy_counts: Dict[str, int] = {}
+    attempt_stats: Dict[str, dict] = {}
+    failures = []
+    for entry in latest.values():
+        for attempt in entry.get("attempts", []):
+            stats = attempt_stats.setdefault(
+                attempt["strategy"], {"runs": 0, "succeeded": 0, "elapsed": 0.0}
+            )
+            stats["runs"] += 1
+            stats["succeeded"] += int(attempt["success"])
+            stats["elapsed"] = round(stats["elapsed"] + attempt["elapsed"], 4)
+        if entry["status"] == STATUS_DONE:
+            strategy = entry.get("strategy_used") or "unknown"
+            strategy_counts[strategy] = strategy_counts.get(strategy, 0) + 1
+        else:
+            failures.append(
+                {"name": entry["name"], "error_message": entry.get("error_message")}
+            )
+
+    return {
+        "journals": per_journal,
+        "total": len(latest),
+        "succeeded": len(latest) - len(failures),
+        "failed": len(failures),
+        "strategy_counts": strategy_counts,
+        "attempt_stats": attempt_stats,
+        "total_elapsed": round(sum(e.get("elapsed", 0.0) for e in latest.values()), 3),
+        "failures": sorted(failures, key=lambda f: f["name"]),
+    }
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
@@ -0,0 +1,153 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterator, Optional
+
+from core.batch import summarize
+from core.data_models import BatchSummary, ImageOutcome, SplitResult
+from core.journal import iter_journal
+from core.processing import (
+    configure_threads,
+    crop_panels,
+    finalize_panels,
+    output_profile,
+    save_panels,
+)
+from utils.image_utils import load_image
+
+
+class ManifestWriter:
+    """
+    Writes the split geometry of a batch as NDJSON, one line per image, for
+    --geometry-only runs. Each line holds the panel rectangles, strategy,
+    confidence and divider bounds of one image (or its error if it failed),
+    which is all a downstream cropper needs. Resumed runs append to the
+    existing manifest.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        manifest_dir = os.path.dirname(path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def record(self, outcome: ImageOutcome):
+        width, height = outcome.image_size or (None, None)
+        entry = {
+            "name": outcome.name,
+            "source": outcome.source,
+            "success": outcome.success,
+            "width": width,
+            "height": height,
+            "strategy_used": outcome.strategy_used,
+            "confidence": outcome.confidence,
+            "panel_rects": outcome.panel_rects if outcome.success else None,
+            "divider_bounds": outcome.divider_bounds if outcome.success else None,
+            "error_message": outcome.error_message,
+        }
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def iter_manifest(path: str) -> Iterator[dict]:
+    """Yields the entries of a manifest, skipping a torn final line."""
+    return iter_journal(path)
+
+
+def apply_manifest(
+    path: str,
+    output_dir: str,
+    config: dict,
+    input_dir: Optional[str] = None,
+    workers: int = 1,
+) -> BatchSummary:
+    """
+    Crops and writes the panels described by a manifest without re-running
+    any analysis. Panels get the same post-processing and names as in a
+    normal run. Sources are read from their recorded path, or looked up by
+    name under 'input_dir' when given. Failed entries are skipped.
+    """
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    configure_threads(config)
+    entries = (e for e in iter_manifest(path) if e.get("success"))
+    # Decoding and encoding release the GIL, so threads are enough here.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        def outcomes() -> Iterator[ImageOutcome]:
+            # Keep a bounded window in flight so huge manifests stream.
+            pending: Deque[Future] = deque()
+            for entry in entries:
+                pending.append(
+                    executor.submit(_apply_entry, entry, output_dir, config, input_dir)
+                )
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+        return summarize(outcomes())
+
+
+def _apply_entry(
+    entry: dict, output_dir: str, config: dict, input_dir: Optional[str]
+) -> ImageOutcome:
+    start = time.perf_counter()
+    name = entry["name"]
+    source = os.path.join(input_dir, name) if input_dir else entry.get("source")
+
+    def failed(message: str) -> ImageOutcome:
+        return ImageOutcome(
+            name=name,
+            success=False,
+            strategy_used=entry.get("strategy_used"),
+            error_message=message,
+            elapsed=time.perf_counter() - start,
+            source=source,
+        )
+
+    try:
+        image = load_image(source) if source else None
+        if image is None:
+            return failed("Failed to load image.")
+        height, width = image.shape[:2]
+        if entry.get("width") is not None and (width, height) != (
+            entry["width"],
+            entry["height"],
+        ):
+            return failed(
+                f"Image is {width}x{height} but the manifest expects "
+                f"{entry['width']}x{entry['height']}."
+            )
+        panel_rects = [tuple(r) for r in entry["panel_rects"]]
+        result = SplitResult(
+            success=True,
+            strategy_used=entry["strategy_used"],
+            confidence=entry["confidence"],
+            images=crop_panels(image, panel_rects),
+            panel_rects=panel_rects,
+            divider_bounds=(
+                tuple(entry["divider_bounds"]) if entry["divider_bounds"] else None
+            ),
+        )
+        panels = finalize_panels(image, result, config)
+        failed_writes = save_panels(
+            panels, name, output_dir, output_profile(config, result.strategy_used)
+        )
+        if failed_writes:
+            return failed(f"Failed to write: {', '.join(failed_writes)}")
+    except Exception as e:
+        return failed(str(e))
+    return ImageOutcome(
+        name=name,
+        success=True,
+        strategy_used=result.strategy_used,
+        confidence=result.confidence,
+        elapsed=time.perf_counter() - start,
+        source=source,
+    )
@@ -0,0 +1,341 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from core.analysis import ImageAnalysis
+from core.batch import summarize
+from core.data_models import BatchSummary, Image, ImageOutcome, InputFile, SplitResult
+from core.image_splitter import ImageSplitter
+from core.processing import (
+    configure_threads,
+    finalize_panels,
+    open_input,
+    output_profile,
+    save_panels,
+    split_image,
+)
+from core.result_cache import ResultCache
+from utils import tracing
+from utils.debug_utils import DebugArtifactWriter
+
+# Sent down a queue to tell the receiving worker that no more jobs will follow.
+_STOP = object()
+
+
+@dataclass
+class _Job:
+    """An image travelling through the pipeline stages."""
+
+    item: InputFile
+    start: float
+    analysis: Optional[ImageAnalysis] = None
+    image_size: Optional[Tuple[int, int]] = None
+    trace: Optional[tracing.ImageTrace] = None
+    cache_key: Optional[str] = None
+    result: Optional[SplitResult] = None
+    panels: Optional[List[Image]] = None
+
+
+class _Stage:
+    """
+    A pool of threads draining one bounded queue into the next. 'work'
+    returns either the job, to be passed on, or its final ImageOutcome,
+    which is handed to 'finish' once the stage's span has been recorded.
+    When the last thread of a stage exits it closes the downstream queue by
+    sending one stop marker per downstream worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        inbox: queue.Queue,
+        work: Callable[[_Job], Union[_Job, ImageOutcome]],
+        outbox: queue.Queue,
+        downstream_workers: int,
+        finish: Callable[[_Job, ImageOutcome], None],
+    ):
+        self.name = name
+        self.inbox = inbox
+        self.work = work
+        self.outbox = outbox
+        self.downstream_workers = downstream_workers
+        self.finish = finish
+        self._alive = workers
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._loop, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _loop(self):
+        while True:
+            job = self.inbox.get()
+            if job is _STOP:
+                break
+            with tracing.activate(job.trace), tracing.span(f"pipeline.{self.name}"):
+                done = self.work(job)
+            if isinstance(done, ImageOutcome):
+                self.finish(job, done)
+            else:
+                self.outbox.put(done)
+
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last:
+            for _ in range(self.downstream_workers):
+                self.outbox.put(_STOP)
+
+
+class PipelinedExecutor:
+    """
+    Processes images through three overlapping stages connected by bounded
+    queues: decode (cv2.imread), analyze (classify, split, post-process) and
+    encode (save_panels). OpenCV releases the GIL for decode and encode, so
+    while one image is being analyzed the next is already being read and the
+    previous one written, and wall time trends towards the slowest stage.
+
+    Images that fail in any stage skip the remaining stages and are reported
+    straight away with their error. With 'geometry_only', post-processing
+    and writing are skipped and the outcomes carry the split geometry.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        output_dir: str,
+        decode_workers: int = 2,
+        analyze_workers: int = 2,
+        encode_workers: int = 2,
+        queue_size: int = 8,
+        geometry_only: bool = False,
+    ):
+        self.config = config
+        self.output_dir = output_dir
+        self.decode_workers = max(1, decode_workers)
+        self.analyze_workers = max(1, analyze_workers)
+        self.encode_workers = max(1, encode_workers)
+        self.queue_size = max(1, queue_size)
+        self.geometry_only = geometry_only
+        # Strategies hold no per-image state, so one splitter serves every thread.
+        self.splitter = ImageSplitter(config)
+        self.cache = ResultCache.from_config(config)
+        self.preview_reduction = config.get("input", {}).get("preview_reduction", 1)
+        configure_threads(config)
+
+    @classmethod
+    def from_config(
+        cls, config: dict, output_dir: str, **kwargs
+    ) -> "PipelinedExecutor":
+        cfg = config.get("pipeline", {})
+        return cls(
+            config,
+            output_dir,
+            decode_workers=cfg.get("decode_workers", 2),
+            analyze_workers=cfg.get("analyze_workers", 2),
+            encode_workers=cfg.get("encode_workers", 2),
+            queue_size=cfg.get("queue_size", 8),
+            **kwargs,
+        )
+
+    def run(self, inputs: Iterable[InputFile]) -> Iterator[ImageOutcome]:
+        """Yields an ImageOutcome for every input file, in completion order."""
+        logging.info(
+            f"Starting pipeline with {self.decode_workers} decode, "
+            f"{self.analyze_workers} analyze and {self.encode_workers} encode workers."
+        )
+        to_decode: queue.Queue = queue.Queue(self.queue_size)
+        to_analyze: queue.Queue = queue.Queue(self.queue_size)
+        to_encode: queue.Queue = queue.Queue(self.queue_size)
+        # Unbounded so a stage never blocks on a slow consumer of outcomes,
+        # which would otherwise stall the whole pipeline.
+        self._outcomes: queue.Queue = queue.Queue()
+        self._debug_writer = DebugArtifactWriter.from_config(self.config)
+
+        stages = [
+            _Stage(
+                "decode",
+                self.decode_workers,
+                to_decode,
+                self._decode,
+                to_analyze,
+                self.analyze_workers,
+                self._finish,
+            ),
+            _Stage(
+                "analyze",
+                self.analyze_workers,
+                to_analyze,
+                self._analyze,
+                to_encode,
+                self.encode_workers,
+                self._finish,
+            ),
+            _Stage(
+                "encode",
+                self.encode_workers,
+                to_encode,
+                self._encode,
+                self._outcomes,
+                1,
+                self._finish,
+            ),
+        ]
+        for stage in stages:
+            stage.start()
+
+        feed_error: list = []
+
+        def feed():
+            try:
+                for item in inputs:
+                    to_decode.put(
+                        _Job(
+                            item=item,
+                            start=time.perf_counter(),
+                            trace=tracing.start_trace(self.config, item.name),
+                        )
+                    )
+            except Exception as e:
+                feed_error.append(e)
+            finally:
+                for _ in range(self.decode_workers):
+                    to_decode.put(_STOP)
+
+        threading.Thread(target=feed, name="pipeline-feeder", daemon=True).start()
+
+        try:
+            while True:
+                outcome = self._outcomes.get()
+                if outcome is _STOP:
+                    break
+                yield outcome
+        finally:
+            if self._debug_writer is not None:
+                self._debug_writer.close()
+
+        if feed_error:
+            raise feed_error[0]
+
+    def process(
+        self,
+        inputs: Iterable[InputFile],
+        on_outcome: Optional[Callable[[ImageOutcome], None]] = None,
+    ) -> BatchSummary:
+        """Processes every input file and returns the aggregated summary."""
+        return summarize(self.run(inputs), on_outcome)
+
+    def _decode(self, job: _Job) -> Union[_Job, ImageOutcome]:
+        logging.info(f"--- Processing image: {job.item.name} ---")
+        try:
+            job.analysis, job.cache_key = open_input(
+                job.item.path, self.cache, self.preview_reduction
+            )
+        except Exception as e:
+            return self._fail(job, str(e))
+        if job.analysis is None:
+            return self._fail(job, "Failed to load image.")
+        return job
+
+    def _analyze(self, job: _Job) -> Union[_Job, ImageOutcome]:
+        try:
+            assert job.analysis is not None
+            analysis = job.analysis
+            job.result = split_image(
+                None,
+                job.item.name,
+                self.splitter,
+                self.config,
+                self.cache,
+                job.cache_key,
+                analysis,
+            )
+            if self._debug_writer is not None:
+                self._debug_writer.submit(analysis.image, job.item.name, job.result)
+            if not (job.result.success and job.result.images):
+                logging.error(
+                    f"Failed to split {job.item.name}: All processing strategies failed."
+                )
+                return self._fail(
+                    job, job.result.error_message or "All strategies failed."
+                )
+            height, width = analysis.image.shape[:2]
+            job.image_size = (width, height)
+            if self.geometry_only:
+                job.panels = []
+            else:
+                logging.info(
+                    f"Successfully split image with {job.result.strategy_used}."
+                )
+                job.panels = finalize_panels(
+                    analysis.image, job.result, self.config, analysis
+                )
+            # The panels are all the encode stage needs; free the derived arrays.
+            job.analysis = None
+        except Exception as e:
+            return self._fail(job, str(e))
+        return job
+
+    def _encode(self, job: _Job) -> ImageOutcome:
+        assert job.result is not None and job.panels is not None
+        error_message = job.result.error_message
+        try:
+            failed_writes = (
+                []
+                if self.geometry_only
+                else save_panels(
+                    job.panels,
+                    job.item.name,
+                    self.output_dir,
+                    output_profile(self.config, job.result.strategy_used),
+                )
+            )
+        except Exception as e:
+            failed_writes, error_message = ["<all panels>"], str(e)
+        if failed_writes and error_message is None:
+            error_message = f"Failed to write: {', '.join(failed_writes)}"
+        return ImageOutcome(
+            name=job.item.name,
+            success=not failed_writes,
+            strategy_used=job.result.strategy_used,
+            confidence=job.result.confidence,
+            error_message=error_message,
+            elapsed=time.perf_counter() - job.start,
+            cache_hit=job.result.cached,
+            attempts=job.result.attempts,
+            source=job.item.path,
+            image_size=job.image_size,
+            panel_rects=job.result.panel_rects,
+            divider_bounds=job.result.divider_bounds,
+        )
+
+    def _fail(self, job: _Job, message: str) -> ImageOutcome:
+        return ImageOutcome(
+            name=job.item.name,
+            success=False,
+            strategy_used=job.result.strategy_used if job.result else None,
+            attempts=job.result.attempts if job.result else [],
+            error_message=message,
+            elapsed=time.perf_counter() - job.start,
+            source=job.item.path,
+        )
+
+    def _finish(self, job: _Job, outcome: ImageOutcome):
+        """
+        Reports a job that left the pipeline. Its trace gets an 'image' span
+        like the one process_file records, covering the same time as
+        'elapsed', with the CPU time of the stages the job went through.
+        """
+        if job.trace is not None:
+            stages = [s for s in job.trace.spans if s.name.startswith("pipeline.")]
+            tracing.add_span(job.trace, "image", job.start, sum(s.cpu for s in stages))
+            outcome.spans = job.trace.spans
+        self._outcomes.put(outcome)
@@ -1,23 +1,65 @@
+import copy
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Optional
+import cv2
 import numpy as np
 
 from classifier.diagnostics import ImageType
 from classifier.image_classifier import ImageClassifier
-from core.data_models import Image, SplitResult
+from core.analysis import PYRAMID_MIN_SIDE, ImageAnalysis
+from core.data_models import Image, SplitResult, StrategyAttempt
 from core.image_splitter import ImageSplitter
-from utils.image_utils import save_image, find_content_bounds
+from core.result_cache import ResultCache
+from utils.debug_utils import DebugArtifactWriter
+from utils.tracing import bound, span, traced
+from utils.image_utils import (
+    ENCODE_WORKERS,
+    decode_image,
+    decode_reduced_image,
+    is_jpeg,
+    load_image,
+    find_content_bounds,
+    read_image_bytes,
+    save_images,
+    set_encode_workers,
+)
+
+PANEL_NAMES = ["1_top_left", "2_top_right", "3_bottom_left", "4_bottom_right"]
+
+# The 'format' values of the 'output' config section, by extension written.
+OUTPUT_FORMATS = {"png": ".png", "jpg": ".jpg", "jpeg": ".jpg", "webp": ".webp"}
+PNG_STRATEGIES = {
+    "default": cv2.IMWRITE_PNG_STRATEGY_DEFAULT,
+    "filtered": cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+    "huffman_only": cv2.IMWRITE_PNG_STRATEGY_HUFFMAN_ONLY,
+    "rle": cv2.IMWRITE_PNG_STRATEGY_RLE,
+    "fixed": cv2.IMWRITE_PNG_STRATEGY_FIXED,
+}
+
+# Threads decoding full-resolution JPEGs behind their previews; see open_input.
+FULL_DECODE_WORKERS = 2
+_full_decode_workers = FULL_DECODE_WORKERS
+_full_decode_pool: Optional[ThreadPoolExecutor] = None
+_full_decode_pool_lock = threading.Lock()
 
 
 # The standardize_and_center_panels function is logically sound for its specific purpose.
 # No changes are needed here.
+@traced("standardize")
 def standardize_and_center_panels(
-    panels: List[Image], main_bg_color: List[int], padding: int, config: dict
+    panels: List[Image],
+    main_bg_color: List[int],
+    padding: int,
+    config: dict,
+    grays: Optional[List[Image]] = None,
 ) -> List[Image]:
     subject_bounds: List[Optional[Tuple[int, int, int, int]]] = []
-    for panel in panels:
-        subject_bounds.append(find_content_bounds(panel, config))
+    for i, panel in enumerate(panels):
+        gray = grays[i] if grays is not None else None
+        subject_bounds.append(find_content_bounds(panel, config, gray=gray))
 
     valid_bounds = [
         b for b in subject_bounds if b is not None and b[2] > 0 and b[3] > 0
@@ -47,66 +89,360 @@ def standardize_and_center_panels(
     return final_panels
 
 
-def process_image(
-    image: Image, filename: str, splitter: ImageSplitter, config: dict, output_dir: str
-):
-    trim_config = config.get("trimming", {})
-    trim_enabled = trim_config.get("enabled", False)
-    padding = trim_config.get("padding", 15)
+def load_input(
+    path: str, cache: Optional[ResultCache] = None
+) -> Tuple[Optional[Image], Optional[str]]:
+    """
+    Loads an input image. When a cache is in use the file is read once and
+    both the decoded image and its cache key are returned.
+    """
+    if cache is None:
+        return load_image(path), None
+    data = read_image_bytes(path)
+    if data is None:
+        return None, None
+    return decode_image(data, path), cache.key_for(data)
 
-    h, w, _ = image.shape
-    margin = 15
-    corners = np.array(
-        [
-            image[margin, margin],
-            image[margin, w - margin],
-            image[h - margin, margin],
-            image[h - margin, w - margin],
-        ]
-    )
-    main_bg_color = np.median(corners, axis=0).astype(int).tolist()
 
+def open_input(
+    path: str, cache: Optional[ResultCache] = None, preview_reduction: int = 1
+) -> Tuple[Optional[ImageAnalysis], Optional[str]]:
+    """
+    Loads an input file and returns its ImageAnalysis and cache key.
+
+    For JPEGs with a 'preview_reduction' of 2, 4 or 8, only a reduced preview
+    is decoded up front, using libjpeg's DCT scaling. It serves
+    classification and the coarse split-point searches, while the full
+    resolution decode runs on a background thread and is only waited for
+    once a strategy or the cropping needs the full image.
+    """
+    if preview_reduction <= 1:
+        with span("decode"):
+            image, cache_key = load_input(path, cache)
+        return (ImageAnalysis(image) if image is not None else None), cache_key
+
+    with span("decode"):
+        data = read_image_bytes(path)
+        if data is None:
+            return None, None
+        cache_key = cache.key_for(data) if cache is not None else None
+        preview = None
+        if is_jpeg(data):
+            preview = decode_reduced_image(data, path, preview_reduction)
+        if preview is None or min(preview.shape[:2]) < PYRAMID_MIN_SIDE:
+            image = decode_image(data, path)
+            return (ImageAnalysis(image) if image is not None else None), cache_key
+
+    decode_full = bound(traced("decode.full")(decode_image))
+    analysis = ImageAnalysis(_get_full_decode_pool().submit(decode_full, data, path))
+    analysis.use_preview(preview, preview_reduction.bit_length() - 1)
+    return analysis, cache_key
+
+
+def configure_threads(config: dict, pool_worker: bool = False):
+    """
+    Sizes the encode and full-decode thread pools that every image in this
+    process shares, from 'output.encode_threads' and 'input.decode_threads'.
+    Settings left unset keep the defaults, except in a batch worker process
+    ('pool_worker'): the processes already occupy every core, so each gets
+    one thread of either kind.
+    """
+    encode_threads = config.get("output", {}).get("encode_threads")
+    decode_threads = config.get("input", {}).get("decode_threads")
+    if pool_worker:
+        encode_threads = encode_threads or 1
+        decode_threads = decode_threads or 1
+    set_encode_workers(encode_threads or ENCODE_WORKERS)
+    set_full_decode_workers(decode_threads or FULL_DECODE_WORKERS)
+
+
+def set_full_decode_workers(workers: int):
+    """
+    Sets the number of full-decode threads, replacing the pool if it
+    already exists with another size.
+    """
+    global _full_decode_pool, _full_decode_workers
+    workers = max(1, workers)
+    with _full_decode_pool_lock:
+        if _full_decode_pool is not None and workers != _full_decode_workers:
+            _full_decode_pool.shutdown()
+            _full_decode_pool = None
+        _full_decode_workers = workers
+
+
+def _get_full_decode_pool() -> ThreadPoolExecutor:
+    global _full_decode_pool
+    with _full_decode_pool_lock:
+        if _full_decode_pool is None:
+            _full_decode_pool = ThreadPoolExecutor(
+                max_workers=_full_decode_workers, thread_name_prefix="full-decode"
+            )
+        return _full_decode_pool
+
+
+def crop_panels(
+    image: Image, panel_rects: List[Tuple[int, int, int, int]]
+) -> List[Image]:
+    """Crops the panels described by a list of (x, y, w, h) rectangles."""
+    return [image[y : y + h, x : x + w] for (x, y, w, h) in panel_rects]
+
+
+def split_image(
+    image: Optional[Image],
+    filename: str,
+    splitter: ImageSplitter,
+    config: dict,
+    cache: Optional[ResultCache] = None,
+    cache_key: Optional[str] = None,
+    analysis: Optional[ImageAnalysis] = None,
+) -> SplitResult:
+    """
+    The analysis stage: classifies the image, dispatches to the matching
+    strategy and falls back to the full pipeline if it fails. With a cache,
+    a hit skips all of that and only re-crops the stored geometry.
+
+    Pass the same ImageAnalysis to finalize_panels afterwards so the
+    post-processor reuses what the classifier and strategies computed.
+    'image' may be None when an analysis from open_input is given.
+    """
+    analysis = analysis or ImageAnalysis(image)
+    if cache is not None and cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None and cached.panel_rects:
+            logging.info(f"Cache hit: reusing '{cached.strategy_used}' geometry.")
+            cached.images = crop_panels(analysis.image, cached.panel_rects)
+            return cached
+
+    result = _analyze(filename, splitter, config, analysis)
+    result.attempts = list(analysis.attempts)
+    result.debug_artifacts = dict(analysis.debug_artifacts)
+    logging.info(f"Attempt chain for {filename}: {format_attempts(result.attempts)}")
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+def _analyze(
+    filename: str,
+    splitter: ImageSplitter,
+    config: dict,
+    analysis: ImageAnalysis,
+) -> SplitResult:
     classifier = ImageClassifier(config)
-    image_type = classifier.diagnose(image)
+    # Classification may run on a preview; the strategies need the full image.
+    with span("classify"):
+        image_type = classifier.diagnose(None, analysis)
+    image = analysis.image
 
     strategy_name = None
     if image_type == ImageType.DIVIDERS_FULL:
         strategy_name = "projection_profile"
+    elif image_type == ImageType.DIVIDERS_VERTICAL_ONLY:
+        strategy_name = "vertical_projection_split"
+    elif image_type == ImageType.DIVIDERS_HORIZONTAL_ONLY:
+        strategy_name = "horizontal_projection_split"
     elif image_type in [ImageType.SEAMLESS_UNIFORM, ImageType.SEAMLESS_COMPLEX]:
         strategy_name = "contour_analysis"
 
     result: SplitResult | None = None
-    if strategy_name:
-        strategy = splitter.get_strategy(strategy_name)
-        if strategy:
-            result = strategy.split(image, filename)
+    # Only a full-divider classification is trusted outright; for anything
+    # else, speculative mode races the candidates instead of trying them in turn.
+    candidates = (
+        splitter.speculative_candidates(strategy_name)
+        if image_type != ImageType.DIVIDERS_FULL
+        else []
+    )
+    if candidates:
+        result = splitter.run_speculative(candidates, image, filename, analysis)
+    elif strategy_name:
+        result = splitter.run_strategy(strategy_name, image, filename, analysis)
 
     if not (result and result.success):
-        result = splitter.run_full_pipeline(image, filename)
+        result = splitter.run_full_pipeline(image, filename, analysis)
+    return result
+
 
+def format_attempts(attempts: List[StrategyAttempt]) -> str:
+    """Renders an attempt chain, e.g. 'a (failed, 12.0 ms) -> b (0.90, 30.1 ms)'."""
+    if not attempts:
+        return "no strategies run"
+    return " -> ".join(
+        f"{a.strategy} ({f'{a.confidence:.2f}' if a.success else 'failed'}, "
+        f"{a.elapsed * 1000:.1f} ms)"
+        for a in attempts
+    )
+
+
+def finalize_panels(
+    image: Image,
+    result: SplitResult,
+    config: dict,
+    analysis: Optional[ImageAnalysis] = None,
+) -> List[Image]:
+    """
+    The post-processing stage: turns a successful SplitResult into the final
+    output panels, standardizing them where the strategy calls for it.
+    """
+    trim_config = config.get("trimming", {})
+    trim_enabled = trim_config.get("enabled", False)
+    padding = trim_config.get("padding", 15)
+
+    final_panels = result.images or []
+
+    # --- THE DEFINITIVE FIX: Revert to specific, correct logic ---
+    # Only apply the smart post-processor to the output of ContourAnalysis.
+    # No other strategy produces output suitable for it.
+    if trim_enabled and result.strategy_used == "contour_analysis":
+        logging.info(
+            f"Applying subject-aware standardization for '{result.strategy_used}' result..."
+        )
+        analysis = analysis or ImageAnalysis(image)
+        main_bg_color = analysis.background_color.astype(int).tolist()
+        grays = (
+            [analysis.gray_region(rect) for rect in result.panel_rects]
+            if result.panel_rects
+            else None
+        )
+        final_panels = standardize_and_center_panels(
+            final_panels, main_bg_color, padding, config, grays
+        )
+    else:
+        logging.info(
+            f"Skipping standardization for '{result.strategy_used}' result as it is not required."
+        )
+    return final_panels
+
+
+def output_profile(config: dict, strategy: Optional[str] = None) -> dict:
+    """
+    The encoder settings for panels split by 'strategy': the 'output' config
+    section with that strategy's entry under 'strategies' merged over it.
+    """
+    output_config = config.get("output", {})
+    profile = copy.deepcopy(
+        {k: v for k, v in output_config.items() if k != "strategies"}
+    )
+    overrides = (output_config.get("strategies") or {}).get(strategy) or {}
+    for key, value in overrides.items():
+        if isinstance(value, dict):
+            profile[key] = {**(profile.get(key) or {}), **value}
+        else:
+            profile[key] = value
+    return profile
+
+
+def output_extension(profile: dict, filename: str) -> str:
+    """The extension panels are written with: the profile's format or the input's."""
+    output_format = str(profile.get("format") or "same").lower()
+    if output_format == "same":
+        return os.path.splitext(filename)[1]
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format '{output_format}'; expected 'same' or one of "
+            f"{sorted(OUTPUT_FORMATS)}."
+        )
+    return OUTPUT_FORMATS[output_format]
+
+
+def encode_params(profile: dict, ext: str) -> List[int]:
+    """
+    The cv2.IMWRITE_* parameters the profile sets for 'ext'. Settings left
+    unset (null) keep OpenCV's defaults.
+    """
+    params: List[int] = []
+    ext = ext.lower()
+    if ext == ".png":
+        png = profile.get("png") or {}
+        # OpenCV resets the strategy when a level is given, so the level goes first.
+        if png.get("compression") is not None:
+            params += [cv2.IMWRITE_PNG_COMPRESSION, int(png["compression"])]
+        if png.get("strategy") is not None:
+            if png["strategy"] not in PNG_STRATEGIES:
+                raise ValueError(
+                    f"Unknown PNG strategy '{png['strategy']}'; expected one of "
+                    f"{sorted(PNG_STRATEGIES)}."
+                )
+            params += [cv2.IMWRITE_PNG_STRATEGY, PNG_STRATEGIES[png["strategy"]]]
+    elif ext in (".jpg", ".jpeg"):
+        jpeg = profile.get("jpeg") or {}
+        if jpeg.get("quality") is not None:
+            params += [cv2.IMWRITE_JPEG_QUALITY, int(jpeg["quality"])]
+        if jpeg.get("progressive"):
+            params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        if jpeg.get("optimize"):
+            params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+    elif ext == ".webp":
+        webp = profile.get("webp") or {}
+        if webp.get("quality") is not None:
+            params += [cv2.IMWRITE_WEBP_QUALITY, int(webp["quality"])]
+    return params
+
+
+@traced("encode")
+def save_panels(
+    panels: List[Image],
+    filename: str,
+    output_dir: str,
+    profile: Optional[dict] = None,
+) -> List[str]:
+    """
+    The encode stage: writes the four panels next to each other in output_dir,
+    in parallel on the shared encoder pool, with the format and settings of
+    the encoder 'profile' (see output_profile). Returns the paths that could
+    not be written, once every write is durable.
+    """
+    profile = profile or {}
+    base_name = os.path.splitext(filename)[0]
+    ext = output_extension(profile, filename)
+    return save_images(
+        [
+            (panel, os.path.join(output_dir, f"{base_name}_{PANEL_NAMES[i]}{ext}"))
+            for i, panel in enumerate(panels)
+        ],
+        encode_params(profile, ext),
+    )
+
+
+def process_image(
+    image: Optional[Image],
+    filename: str,
+    splitter: ImageSplitter,
+    config: dict,
+    output_dir: str,
+    cache: Optional[ResultCache] = None,
+    cache_key: Optional[str] = None,
+    analysis: Optional[ImageAnalysis] = None,
+    geometry_only: bool = False,
+    debug_writer: Optional[DebugArtifactWriter] = None,
+) -> SplitResult:
+    """
+    Classifies, splits, post-processes and saves a single image. Returns the
+    SplitResult of the accepted strategy so callers can report on it. Pass
+    the analysis from open_input (and no image) to overlap the full decode
+    with classification. With 'geometry_only', nothing is written: callers
+    record the result's geometry instead. A 'debug_writer' gets the result's
+    debug artifacts to draw in the background.
+    """
+    analysis = analysis or ImageAnalysis(image)
+    result = split_image(image, filename, splitter, config, cache, cache_key, analysis)
+    if debug_writer is not None:
+        debug_writer.submit(analysis.image, filename, result)
+
+    if result and result.success and geometry_only:
+        return result
     if result and result.success and result.images:
         logging.info(f"Successfully split image with {result.strategy_used}.")
-        final_panels = result.images
-
-        # --- THE DEFINITIVE FIX: Revert to specific, correct logic ---
-        # Only apply the smart post-processor to the output of ContourAnalysis.
-        # No other strategy produces output suitable for it.
-        if trim_enabled and result.strategy_used == "contour_analysis":
-            logging.info(
-                f"Applying subject-aware standardization for '{result.strategy_used}' result..."
-            )
-            final_panels = standardize_and_center_panels(
-                result.images, main_bg_color, padding, config
-            )
-        else:
-            logging.info(
-                f"Skipping standardization for '{result.strategy_used}' result as it is not required."
-            )
+        final_panels = finalize_panels(analysis.image, result, config, analysis)
+        failed_writes = save_panels(
+            final_panels,
+            filename,
+            output_dir,
+            output_profile(config, result.strategy_used),
+        )
+        if failed_writes:
+            result.success = False
+            result.error_message = f"Failed to write: {', '.join(failed_writes)}"
+        return result
 
-        base_name, ext = os.path.splitext(filename)
-        names = ["1_top_left", "2_top_right", "3_bottom_left", "4_bottom_right"]
-        for i, panel in enumerate(final_panels):
-            output_path = os.path.join(output_dir, f"{base_name}_{names[i]}{ext}")
-            save_image(panel, output_path)
-    else:
-        logging.error(f"Failed to split {filename}: All processing strategies failed.")
+    logging.error(f"Failed to split {filename}: All processing strategies failed.")
+    return result
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from core.data_models import SplitResult
+
+# Bump whenever a change to the strategies alters the geometry they produce,
+# so results computed by older code are never served.
+CACHE_FORMAT_VERSION = 3
+
+# Top-level config keys that can never change the split geometry. Every other
+# section (classifier, trimming, the strategy pipeline and each strategy's
+# parameters) is part of the cache key.
+_NON_GEOMETRY_KEYS = {
+    "debug_mode",
+    "save_debug_artifacts",
+    "debug_artifacts",
+    "pipeline",
+    "output",
+    "cache",
+    "tracing",
+    "watch",
+}
+
+# Settings within the remaining sections that cannot change it either: which
+# files are picked up, thread counts, and how many speculative candidates run
+# at once (the highest-priority acceptable one wins regardless).
+_NON_GEOMETRY_SETTINGS = {
+    "input": {"extensions", "decode_threads"},
+    "speculative": {"parallel", "max_workers"},
+}
+
+
+def config_fingerprint(config: dict) -> str:
+    """Hashes the configuration settings that affect the split geometry."""
+    relevant = {}
+    for key, value in config.items():
+        if key in _NON_GEOMETRY_KEYS:
+            continue
+        ignored = _NON_GEOMETRY_SETTINGS.get(key)
+        if ignored and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k not in ignored}
+        relevant[key] = value
+    relevant["_format"] = CACHE_FORMAT_VERSION
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    """
+    A content-addressed, on-disk cache of split geometry.
+
+    Entries are keyed by a hash of the encoded input bytes combined with the
+    config fingerprint, so renamed or copied files still hit while any change
+    to the pixels or to a relevant parameter misses. Only the geometry of a
+    successful SplitResult is stored; on a hit the panels are simply cropped
+    again from the decoded image.
+
+    The backing store is a SQLite database, which makes it safe to share
+    between the worker processes of a batch run. Total payload size is capped
+    at 'max_size_mb'; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_size_mb: float = 256, fingerprint: str = ""):
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+        )
+        self._db.commit()
+        # Running estimate of the payload total, so the exact (full-table) sum
+        # is only recomputed once the cap may have been reached.
+        self._approx_size = self._total_size()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["ResultCache"]:
+        """Opens the cache described by the 'cache' config section, if enabled."""
+        cfg = config.get("cache", {})
+        if not cfg.get("enabled", False):
+            return None
+        try:
+            return cls(
+                cfg.get("path", ".split_cache.sqlite"),
+                max_size_mb=cfg.get("max_size_mb", 256),
+                fingerprint=config_fingerprint(config),
+            )
+        except Exception as e:
+            logging.error(f"Failed to open result cache, continuing without it: {e}")
+            return None
+
+    def key_for(self, data: bytes) -> str:
+        """Builds the cache key for the encoded bytes of an input image."""
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{digest}:{self.fingerprint}"
+
+    def get(self, key: str) -> Optional[SplitResult]:
+        """Returns the cached geometry as a SplitResult without images, or None."""
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT payload FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE entries SET last_used = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Result cache lookup failed: {e}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        entry = json.loads(row[0])
+        return SplitResult(
+            success=True,
+            strategy_used=entry["strategy_used"],
+            confidence=entry["confidence"],
+            bounds=_as_tuples(entry["bounds"]),
+            panel_rects=_as_tuples(entry["panel_rects"]),
+            divider_bounds=(
+                tuple(entry["divider_bounds"]) if entry["divider_bounds"] else None
+            ),
+            cached=True,
+        )
+
+    def put(self, key: str, result: SplitResult):
+        """Stores the geometry of a successful result and enforces the size cap."""
+        if not (result.success and result.panel_rects):
+            return
+        payload = json.dumps(
+            {
+                "strategy_used": result.strategy_used,
+                "confidence": result.confidence,
+                "bounds": result.bounds,
+                "panel_rects": result.panel_rects,
+                "divider_bounds": result.divider_bounds,
+            }
+        )
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, payload, len(payload), time.time()),
+                )
+                self._approx_size += len(payload)
+                if self._approx_size > self.max_bytes:
+                    self._evict()
+                self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Result cache store failed: {e}")
+
+    def _total_size(self) -> int:
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return int(total)
+
+    def _evict(self):
+        # Other processes may share the database, so start from the true total.
+        total = self._total_size()
+        self._approx_size = total
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the cap so the next few inserts don't each
+        # trigger another eviction pass.
+        target = total - int(self.max_bytes * 0.9)
+        evicted, freed = [], 0
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ):
+            if freed >= target:
+                break
+            evicted.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._approx_size -= freed
+        logging.debug(f"Result cache evicted {len(evicted)} entries ({freed} bytes).")
+
+    def close(self):
+        self._db.close()
+
+
+def _as_tuples(values):
+    return [tuple(v) for v in values] if values is not None else None
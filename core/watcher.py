@@ -0,0 +1,250 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from core.data_models import InputFile
+from core.discovery import DEFAULT_EXTENSIONS, matches_any, discover_inputs
+
+# inotify constants from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """A minimal ctypes binding to the Linux inotify API."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+
+    def add_watch(self, path: str):
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.watches[wd] = path
+
+    def read_events(self, timeout: float) -> Iterator[Tuple[str, int]]:
+        """Yields (path, mask) pairs for the events that arrive within 'timeout'."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & _IN_Q_OVERFLOW:
+                yield "", mask
+                continue
+            directory = self.watches.get(wd)
+            if directory is not None:
+                yield os.path.join(directory, os.fsdecode(name)), mask
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Watches a drop folder and yields every image that lands in it as an
+    endless stream of InputFile items, ready to be fed to BatchProcessor or
+    PipelinedExecutor.
+
+    Images already present at start-up are yielded first. After that, on
+    Linux, inotify close-write and moved-to events are used so new files are
+    picked up the moment their writer closes them; elsewhere (or if inotify
+    is unavailable) the folder is polled. Either way a file is only yielded
+    once it has been quiet for 'debounce' seconds, so uploads that are
+    written in several sessions are not processed half-way through.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        recursive: bool = False,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+        debounce: float = 0.25,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ):
+        self.root = root
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, root: str, config: dict, **kwargs) -> "FolderWatcher":
+        cfg = config.get("watch", {})
+        return cls(
+            root,
+            extensions=config.get("input", {}).get("extensions", DEFAULT_EXTENSIONS),
+            debounce=cfg.get("debounce_seconds", 0.25),
+            poll_interval=cfg.get("poll_interval_seconds", 1.0),
+            use_inotify=cfg.get("use_inotify", True),
+            **kwargs,
+        )
+
+    def stop(self):
+        """Ends the stream; safe to call from a signal handler or another thread."""
+        self._stop.set()
+
+    def __iter__(self) -> Iterator[InputFile]:
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify()
+                self._watch_tree(inotify, self.root)
+            except (OSError, AttributeError) as e:
+                logging.warning(f"inotify unavailable ({e}); falling back to polling.")
+                if inotify is not None:
+                    inotify.close()
+                inotify = None
+
+        # Catch up on everything that arrived while we were not running. With
+        # inotify the watches are already in place, so nothing is missed.
+        seen: Dict[str, Optional[Tuple[int, int]]] = {}
+        for item in self._scan():
+            seen[item.path] = _signature(item.path)
+            yield item
+
+        logging.info(
+            f"Watching {self.root} for new images "
+            f"({'inotify' if inotify else 'polling'})."
+        )
+        try:
+            if inotify is not None:
+                yield from self._watch_inotify(inotify)
+            else:
+                yield from self._watch_polling(seen)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _scan(self) -> Iterator[InputFile]:
+        return discover_inputs(
+            self.root,
+            recursive=self.recursive,
+            include=self.include,
+            exclude=self.exclude,
+            extensions=self.extensions,
+        )
+
+    def _watch_tree(self, inotify: _Inotify, directory: str):
+        inotify.add_watch(directory)
+        if not self.recursive:
+            return
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                if entry.is_dir() and not self._excluded(entry.path):
+                    self._watch_tree(inotify, entry.path)
+
+    def _watch_inotify(self, inotify: _Inotify) -> Iterator[InputFile]:
+        # Path -> time at which it is considered fully written.
+        deadlines: Dict[str, float] = {}
+        while not self._stop.is_set():
+            now = time.monotonic()
+            timeout = min([d - now for d in deadlines.values()] + [0.5])
+            for path, mask in inotify.read_events(max(0.0, timeout)):
+                if mask & _IN_Q_OVERFLOW:
+                    # The kernel dropped events; rescan to recover them.
+                    logging.warning("inotify queue overflowed; rescanning folder.")
+                    for item in self._scan():
+                        deadlines[item.path] = time.monotonic() + self.debounce
+                elif mask & _IN_ISDIR:
+                    if self.recursive and not self._excluded(path):
+                        self._watch_tree(inotify, path)
+                        # Files may have landed before the watch was added.
+                        for item in self._scan_dir(path):
+                            deadlines[item.path] = time.monotonic() + self.debounce
+                elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                    deadlines[path] = time.monotonic() + self.debounce
+
+            now = time.monotonic()
+            for path in [p for p, d in deadlines.items() if d <= now]:
+                del deadlines[path]
+                item = self._to_input(path)
+                if item is not None:
+                    yield item
+
+    def _watch_polling(
+        self, seen: Dict[str, Optional[Tuple[int, int]]]
+    ) -> Iterator[InputFile]:
+        # Path -> (signature, time it was first observed with that signature).
+        changing: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        while not self._stop.wait(self.poll_interval):
+            now = time.monotonic()
+            for item in self._scan():
+                signature = _signature(item.path)
+                if signature is None or seen.get(item.path) == signature:
+                    continue
+                previous = changing.get(item.path)
+                if previous is None or previous[0] != signature:
+                    changing[item.path] = (signature, now)
+                elif now - previous[1] >= self.debounce:
+                    del changing[item.path]
+                    seen[item.path] = signature
+                    yield item
+
+    def _scan_dir(self, directory: str) -> Iterator[InputFile]:
+        for found in discover_inputs(
+            directory, recursive=True, extensions=self.extensions
+        ):
+            item = self._to_input(found.path)
+            if item is not None:
+                yield item
+
+    def _to_input(self, path: str) -> Optional[InputFile]:
+        """Applies the discovery filters to a single path."""
+        if not os.path.isfile(path):
+            return None
+        name = os.path.relpath(path, self.root).replace(os.sep, "/")
+        if not name.lower().endswith(self.extensions):
+            return None
+        if self.include and not matches_any(name, self.include):
+            return None
+        if matches_any(name, self.exclude):
+            return None
+        return InputFile(path=path, name=name)
+
+    def _excluded(self, path: str) -> bool:
+        name = os.path.relpath(path, self.root).replace(os.sep, "/")
+        return matches_any(name, self.exclude)
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
@@ -1,13 +1,25 @@
 import os
 import argparse
+import json
 import yaml
 import logging
+import signal
 import sys
 
 from utils.logging_config import setup_logging
-from utils.image_utils import load_image
-from core.image_splitter import ImageSplitter
-from core.processing import process_image  # <-- IMPORT THE NEW ENGINE
+from core.batch import BatchProcessor, log_summary
+from core.discovery import (
+    DEFAULT_EXTENSIONS,
+    discover_inputs,
+    parse_shard,
+    read_path_list,
+    shard_inputs,
+)
+from core.journal import ProgressJournal, merge_journals
+from core.manifest import ManifestWriter, apply_manifest
+from core.pipeline import PipelinedExecutor
+from core.watcher import FolderWatcher
+from utils.tracing import TraceWriter
 
 
 def load_config(config_path: str) -> dict | None:
@@ -20,6 +32,35 @@ def load_config(config_path: str) -> dict | None:
         return None
 
 
+def merge_reports(args):
+    """Merges per-node journals into one combined JSON report."""
+    report = merge_journals(args.merge_journals)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        logging.info(
+            f"Wrote combined report for {report['total']} images to {args.report}."
+        )
+    else:
+        print(text)
+
+
+def apply_manifest_command(args, config: dict):
+    """Crops the panels described by a geometry manifest, without analysis."""
+    if not args.output_dir:
+        logging.error("--output-dir is required.")
+        sys.exit(1)
+    summary = apply_manifest(
+        args.apply_manifest,
+        args.output_dir,
+        config,
+        input_dir=args.input_dir,
+        workers=args.workers,
+    )
+    log_summary(summary)
+
+
 def main(args):
     """
     The main entry point. Handles setup and file iteration, but delegates
@@ -29,29 +70,128 @@ def main(args):
     if config is None:
         sys.exit(1)
 
-    setup_logging(debug=config.get("debug_mode", False))
+    # A report printed to stdout must not be interleaved with log lines.
+    report_to_stdout = args.merge_journals and not args.report
+    setup_logging(
+        debug=config.get("debug_mode", False),
+        stream=sys.stderr if report_to_stdout else None,
+    )
+
+    if args.merge_journals:
+        merge_reports(args)
+        return
+    if args.apply_manifest:
+        apply_manifest_command(args, config)
+        return
 
-    if not os.path.isdir(args.input_dir):
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            logging.error(str(e))
+            sys.exit(1)
+
+    if not args.output_dir:
+        logging.error("--output-dir is required.")
+        sys.exit(1)
+    if args.watch and not args.input_dir:
+        logging.error("--watch requires --input-dir.")
+        sys.exit(1)
+    if not args.input_dir and not args.paths_from and not args.retry_failed:
+        # --retry-failed reads the paths of the failed images from the journal
+        logging.error("Either --input-dir or --paths-from is required.")
+        sys.exit(1)
+    if args.input_dir and not os.path.isdir(args.input_dir):
         logging.error(f"Input directory not found: {args.input_dir}")
         sys.exit(1)
     if not os.path.isdir(args.output_dir):
         os.makedirs(args.output_dir, exist_ok=True)
 
-    # Instantiate the splitter once
-    splitter = ImageSplitter(config)
+    journal_name = ".progress.jsonl"
+    if shard:
+        # Each node writes its own journal; merge them with --merge-journals
+        journal_name = f".progress.shard-{shard[0]}-of-{shard[1]}.jsonl"
+    journal_path = args.journal or os.path.join(args.output_dir, journal_name)
+    journal = ProgressJournal(journal_path, resume=args.resume or args.retry_failed)
 
-    valid_extensions = (".png", ".jpg", ".jpeg", ".bmp", ".tiff")
-    for filename in os.listdir(args.input_dir):
-        if filename.lower().endswith(valid_extensions):
-            image_path = os.path.join(args.input_dir, filename)
-            logging.info(f"--- Processing image: {filename} ---")
+    if args.retry_failed:
+        inputs = journal.failed_inputs(args.input_dir or "")
+    else:
+        # Inputs are discovered lazily, so processing starts with the first file
+        if args.watch:
+            watcher = FolderWatcher.from_config(
+                args.input_dir,
+                config,
+                recursive=args.recursive,
+                include=args.include,
+                exclude=args.exclude,
+            )
+            # Let Ctrl-C / SIGTERM end the stream so the run drains and reports
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: watcher.stop())
+            inputs = iter(watcher)
+        elif args.paths_from:
+            inputs = read_path_list(args.paths_from, root=args.input_dir)
+        else:
+            inputs = discover_inputs(
+                args.input_dir,
+                recursive=args.recursive,
+                include=args.include,
+                exclude=args.exclude,
+                extensions=config.get("input", {}).get(
+                    "extensions", DEFAULT_EXTENSIONS
+                ),
+            )
+        if shard:
+            inputs = shard_inputs(inputs, *shard)
+        if args.resume:
+            inputs = journal.pending(inputs)
 
-            image = load_image(image_path)
-            if image is not None:
-                # Delegate all the hard work to our new processing function
-                process_image(image, filename, splitter, config, args.output_dir)
+    if args.pipeline:
+        processor = PipelinedExecutor.from_config(
+            config, args.output_dir, geometry_only=args.geometry_only
+        )
+    else:
+        # Each worker instantiates its own splitter once and reuses it
+        processor = BatchProcessor(
+            config,
+            args.output_dir,
+            workers=args.workers,
+            ordered=args.ordered,
+            geometry_only=args.geometry_only,
+        )
 
-            print("-" * 50)
+    manifest = None
+    if args.geometry_only:
+        manifest_name = "manifest.ndjson"
+        if shard:
+            manifest_name = f"manifest.shard-{shard[0]}-of-{shard[1]}.ndjson"
+        manifest = ManifestWriter(
+            args.manifest or os.path.join(args.output_dir, manifest_name),
+            append=args.resume or args.retry_failed,
+        )
+
+    trace_writer = TraceWriter.from_config(config, args.output_dir)
+
+    def on_outcome(outcome):
+        journal.record(outcome)
+        if manifest is not None:
+            manifest.record(outcome)
+        if trace_writer is not None:
+            trace_writer.record(outcome)
+
+    try:
+        summary = processor.process(inputs, on_outcome=on_outcome)
+    finally:
+        journal.close()
+        if manifest is not None:
+            manifest.close()
+        if trace_writer is not None:
+            trace_writer.close()
+    log_summary(summary)
+    if trace_writer is not None:
+        trace_writer.log_summary()
 
 
 if __name__ == "__main__":
@@ -59,10 +199,10 @@ if __name__ == "__main__":
         description="Split composite images into four quadrants."
     )
     parser.add_argument(
-        "--input-dir", type=str, required=True, help="Directory for input images."
+        "--input-dir", type=str, default=None, help="Directory for input images."
     )
     parser.add_argument(
-        "--output-dir", type=str, required=True, help="Directory for output images."
+        "--output-dir", type=str, default=None, help="Directory for output images."
     )
     parser.add_argument(
         "--config",
@@ -70,6 +210,105 @@ if __name__ == "__main__":
         default="config.yaml",
         help="Path to the configuration file.",
     )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Also process images in subdirectories of the input directory.",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="Only process paths (relative to the input directory) matching GLOB.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="Skip paths and directories matching GLOB.",
+    )
+    parser.add_argument(
+        "--paths-from",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Read image paths from FILE, one per line ('-' for stdin).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and process new images as they land in the input directory.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        metavar="INDEX/COUNT",
+        help="Process only shard INDEX (0-based) of COUNT, e.g. 2/8.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (0 = one per CPU core).",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="Report results in input order instead of completion order.",
+    )
+
+    parser.add_argument(
+        "--journal",
+        type=str,
+        default=None,
+        help="Progress journal path (default: <output-dir>/.progress.jsonl).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip images the journal already records as completed.",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Re-process only the images the journal records as failed.",
+    )
+    parser.add_argument(
+        "--merge-journals",
+        nargs="+",
+        metavar="JOURNAL",
+        help="Merge the given journals into one report instead of processing.",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Where --merge-journals writes its JSON report (default: stdout).",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap decode, analysis and encode on threads (see 'pipeline' in the config).",
+    )
+    parser.add_argument(
+        "--geometry-only",
+        action="store_true",
+        help="Write only an NDJSON manifest of the panel geometry, no images.",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="Manifest path for --geometry-only (default: <output-dir>/manifest.ndjson).",
+    )
+    parser.add_argument(
+        "--apply-manifest",
+        type=str,
+        default=None,
+        metavar="MANIFEST",
+        help="Crop the panels recorded in MANIFEST instead of analyzing images.",
+    )
 
     args = parser.parse_args()
     main(args)
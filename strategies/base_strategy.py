@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from typing import Optional
+from core.analysis import ImageAnalysis
 from core.data_models import SplitResult, Image
 
 
@@ -12,7 +14,9 @@ class BaseSplittingStrategy(ABC):
         self.debug = debug
 
     @abstractmethod
-    def split(self, image: Image, filename: str) -> SplitResult:
+    def split(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         """
         The core method that attempts to split the input image.
         This method MUST be implemented by all concrete strategy classes.
@@ -20,6 +24,9 @@ class BaseSplittingStrategy(ABC):
         Args:
             image (Image): The input image (as a NumPy array) to be split.
             filename (str): The original filename, used for unique debug outputs.
+            analysis (ImageAnalysis): The image's shared analysis context, used
+                to reuse derived arrays such as the grayscale image. Created on
+                demand when omitted.
 
         Returns:
             SplitResult: An object containing the outcome of the splitting attempt.
@@ -1,11 +1,17 @@
 import cv2
 import numpy as np
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+from core.analysis import ImageAnalysis, scaled_size
 from core.data_models import SplitResult, Image
 from strategies.base_strategy import BaseSplittingStrategy
-from utils.debug_utils import save_contour_debug_image
+
+# Panels found on a pyramid level are only trusted if the smallest covers at
+# least this share of the largest's area, and their aspect ratios differ by
+# at most this factor; otherwise detection is redone at full resolution.
+PLAUSIBLE_AREA_RATIO = 0.25
+PLAUSIBLE_ASPECT_RATIO = 2.0
 
 
 class ContourAnalysisStrategy(BaseSplittingStrategy):
@@ -14,53 +20,47 @@ class ContourAnalysisStrategy(BaseSplittingStrategy):
     algorithm to correctly order panels regardless of their alignment.
     """
 
-    def split(self, image: Image, filename: str) -> SplitResult:
+    def split(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            height, width = gray.shape
-            total_area = height * width
-
-            cfg = self.config
-            block_size = cfg.get("adaptive_block_size", 15)
-            c_value = cfg.get("adaptive_c_value", 4)
-            kernel_size = cfg.get("morph_kernel_size", 5)
-            min_area_ratio = cfg.get("min_contour_area_ratio", 0.01)
-            morph_operation = cfg.get("morph_operation", "close")
-
-            thresh = cv2.adaptiveThreshold(
-                gray,
-                255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY_INV,
-                block_size,
-                c_value,
-            )
-            kernel = np.ones((kernel_size, kernel_size), np.uint8)
-            cleaned_mask = (
-                cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-                if morph_operation == "close"
-                else cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-            )
+            analysis = analysis or ImageAnalysis(image)
+            height, width = analysis.gray.shape
 
-            contours, _ = cv2.findContours(
-                cleaned_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-            )
-            min_area = total_area * min_area_ratio
-            valid_contours = [c for c in contours if cv2.contourArea(c) > min_area]
+            # With 'pyramid_levels' set, panels are found on a downscaled copy
+            # and only their edges are refined at full resolution.
+            coarse = analysis.downscaled(self.config.get("pyramid_levels", 0))
+            scale = coarse.scale
+            valid_contours, bounding_boxes = self._find_panels(coarse)
+            if scale > 1:
+                # Faint panel outlines can vanish on a small copy, leaving the
+                # objects inside them or nothing at all, and a panel can merge
+                # with its surroundings at full resolution but not on the copy.
+                # Rather than keep such boxes, start over at full resolution.
+                problem = self._implausible(bounding_boxes, coarse.gray.shape)
+                if not problem:
+                    refined = [
+                        self._refine_box(analysis.gray, box, scale)
+                        for box in bounding_boxes
+                    ]
+                    if None in refined:
+                        problem = "a panel does not end where it was found"
+                if problem:
+                    logging.info(
+                        f"Contour Analysis: {problem} at 1/{scale} scale; "
+                        "retrying at full resolution."
+                    )
+                    valid_contours, bounding_boxes = self._find_panels(analysis)
+                else:
+                    bounding_boxes = refined
+                    valid_contours = [c * scale for c in valid_contours]
 
             if len(valid_contours) < 4:
                 return self._failed_result(
                     f"Found only {len(valid_contours)} distinct content areas. Needed 4."
                 )
-
-            valid_contours.sort(key=cv2.contourArea, reverse=True)
             top_4_contours = valid_contours[:4]
 
-            bounding_boxes: List[Tuple[int, int, int, int]] = []
-            for c in top_4_contours:
-                x, y, w, h = cv2.boundingRect(c)
-                bounding_boxes.append((int(x), int(y), int(w), int(h)))
-
             # --- THE ROBUST FIX: Use corner-based sorting instead of fragile row sorting ---
             # Calculate the center of each bounding box
             centers = [
@@ -100,18 +100,10 @@ class ContourAnalysisStrategy(BaseSplittingStrategy):
             cropped_images = [
                 image[y : y + h, x : x + w] for (x, y, w, h) in sorted_boxes
             ]
-            relative_bounds = [(0, 0, int(w), int(h)) for _, _, w, h in sorted_boxes]
-
-            if self.debug:
-                debug_dir = "output_results/debug"
-                save_contour_debug_image(
-                    image,
-                    valid_contours,
-                    top_4_contours,
-                    sorted_boxes,
-                    debug_dir,
-                    filename,
-                )
+            # Content bounds are only needed to standardize the panels, so
+            # post-processing measures them once it knows it will (see
+            # finalize_panels); zero-size boxes mark them as unknown.
+            relative_bounds = [(0, 0, 0, 0)] * 4
 
             return SplitResult(
                 success=True,
@@ -119,10 +111,168 @@ class ContourAnalysisStrategy(BaseSplittingStrategy):
                 confidence=0.9,
                 images=cropped_images,
                 bounds=relative_bounds,
+                panel_rects=sorted_boxes,
+                debug_artifacts=(
+                    {
+                        "contours": {
+                            "contours": valid_contours,
+                            "selected_contours": top_4_contours,
+                            "sorted_boxes": sorted_boxes,
+                        }
+                    }
+                    if self.debug
+                    else {}
+                ),
             )
         except Exception as e:
             return self._failed_result(str(e))
 
+    def _find_panels(
+        self, level: ImageAnalysis
+    ) -> Tuple[List[np.ndarray], List[Tuple[int, int, int, int]]]:
+        """
+        The contours of the content areas large enough to be panels on a
+        pyramid level, largest first, and the bounding boxes of the top four.
+        """
+        cleaned_mask = self._panel_mask(level.gray, level.scale)
+        contours, _ = cv2.findContours(
+            cleaned_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        min_area_ratio = self.config.get("min_contour_area_ratio", 0.01)
+        min_area = cleaned_mask.shape[0] * cleaned_mask.shape[1] * min_area_ratio
+        valid_contours = [c for c in contours if cv2.contourArea(c) > min_area]
+        valid_contours.sort(key=cv2.contourArea, reverse=True)
+        bounding_boxes = [
+            tuple(int(v) for v in cv2.boundingRect(c)) for c in valid_contours[:4]
+        ]
+        return valid_contours, bounding_boxes
+
+    @staticmethod
+    def _implausible(
+        boxes: List[Tuple[int, int, int, int]], shape: Tuple[int, int]
+    ) -> Optional[str]:
+        """
+        Why the boxes found on a pyramid level cannot be the four panels of
+        a 2x2 composite, or None if they can: there must be one per quadrant,
+        and no box may be far smaller than, or shaped far unlike, the others.
+        """
+        if len(boxes) < 4:
+            return f"found only {len(boxes)} content areas"
+        height, width = shape[:2]
+        quadrants = {
+            (x + w / 2 >= width / 2, y + h / 2 >= height / 2) for x, y, w, h in boxes
+        }
+        if len(quadrants) < 4:
+            return "found no panel in some quadrant"
+        areas = [w * h for _, _, w, h in boxes]
+        if min(areas) < PLAUSIBLE_AREA_RATIO * max(areas):
+            return "found panels of very different sizes"
+        aspects = [w / h for _, _, w, h in boxes]
+        if max(aspects) > PLAUSIBLE_ASPECT_RATIO * min(aspects):
+            return "found panels of very different shapes"
+        return None
+
+    def _panel_mask(self, gray: Image, scale: int = 1) -> Image:
+        """
+        Thresholds and cleans 'gray' into a foreground mask of the panels.
+        The kernel sizes are shrunk to match when 'gray' is a pyramid level.
+        """
+        cfg = self.config
+        block_size = cfg.get("adaptive_block_size", 15)
+        kernel_size = cfg.get("morph_kernel_size", 5)
+        if scale > 1:
+            block_size = scaled_size(block_size, scale, odd=True)
+            kernel_size = scaled_size(kernel_size, scale)
+        thresh = cv2.adaptiveThreshold(
+            gray,
+            255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            block_size,
+            cfg.get("adaptive_c_value", 4),
+        )
+        kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        return (
+            cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+            if cfg.get("morph_operation", "close") == "close"
+            else cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+        )
+
+    def _mask_region(self, gray: Image, x0: int, y0: int, x1: int, y1: int) -> Image:
+        """
+        The full-resolution panel mask of the region [x0, x1) x [y0, y1),
+        identical to the same crop of the whole-image mask. The region is
+        padded by the reach of the threshold and morphology kernels before
+        masking, then cropped back.
+        """
+        height, width = gray.shape
+        pad = (
+            self.config.get("adaptive_block_size", 15) // 2
+            + 2 * (self.config.get("morph_kernel_size", 5) // 2)
+            + 1
+        )
+        px0, py0 = max(0, x0 - pad), max(0, y0 - pad)
+        px1, py1 = min(width, x1 + pad), min(height, y1 + pad)
+        mask = self._panel_mask(gray[py0:py1, px0:px1])
+        return mask[y0 - py0 : y1 - py0, x0 - px0 : x1 - px0]
+
+    def _refine_box(
+        self, gray: Image, box: Tuple[int, int, int, int], scale: int
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Maps a box found on a pyramid level back to full resolution, then
+        moves each edge within a narrow band (two coarse pixels either side)
+        around it, to the last foreground line reached from inside the box
+        without crossing an empty one. Specks of noise just outside a panel,
+        which the full-resolution contours leave out, are skipped that way.
+
+        None if the foreground runs on to the far end of a band (short of
+        the image border): the panel does not end near the edge found on the
+        pyramid level, whether it was cut short there or merges with its
+        surroundings at full resolution.
+        """
+        height, width = gray.shape
+        margin = 2 * scale
+        x0, y0 = box[0] * scale, box[1] * scale
+        x1 = min(width, (box[0] + box[2]) * scale)
+        y1 = min(height, (box[1] + box[3]) * scale)
+
+        def band(lo: int, hi: int, limit: int) -> Tuple[int, int]:
+            return max(0, lo - margin), min(limit, hi + margin)
+
+        def unbounded(lines: np.ndarray, reach: Optional[int], at_border: bool):
+            return reach == len(lines) and not at_border
+
+        # Left and right edges: columns of foreground within the box's rows.
+        lx0, lx1 = band(x0, x0, width)
+        cols = self._mask_region(gray, lx0, y0, lx1, y1).any(axis=0)
+        reach = _outward_reach(cols[::-1])
+        if unbounded(cols, reach, lx0 == 0):
+            return None
+        left = lx1 - reach if reach is not None else x0
+        rx0, rx1 = band(x1, x1, width)
+        cols = self._mask_region(gray, rx0, y0, rx1, y1).any(axis=0)
+        reach = _outward_reach(cols)
+        if unbounded(cols, reach, rx1 == width):
+            return None
+        right = rx0 + reach if reach is not None else x1
+
+        # Top and bottom edges: rows of foreground within the refined columns.
+        ty0, ty1 = band(y0, y0, height)
+        rows = self._mask_region(gray, left, ty0, right, ty1).any(axis=1)
+        reach = _outward_reach(rows[::-1])
+        if unbounded(rows, reach, ty0 == 0):
+            return None
+        top = ty1 - reach if reach is not None else y0
+        by0, by1 = band(y1, y1, height)
+        rows = self._mask_region(gray, left, by0, right, by1).any(axis=1)
+        reach = _outward_reach(rows)
+        if unbounded(rows, reach, by1 == height):
+            return None
+        bottom = by0 + reach if reach is not None else y1
+
+        return (left, top, right - left, bottom - top)
+
     def _failed_result(self, message: str) -> SplitResult:
         logging.warning(f"Contour Analysis failed: {message}")
         return SplitResult(
@@ -131,3 +281,16 @@ class ContourAnalysisStrategy(BaseSplittingStrategy):
             confidence=0.0,
             error_message=message,
         )
+
+
+def _outward_reach(lines: np.ndarray) -> Optional[int]:
+    """
+    How many of 'lines' (whether each holds foreground, innermost first) the
+    panel covers: up to the first empty line, or, if the innermost is empty
+    already, up to the outermost foreground line. None if all are empty.
+    """
+    if not lines.any():
+        return None
+    if lines[0]:
+        return len(lines) if lines.all() else int(np.argmin(lines))
+    return len(lines) - int(np.argmax(lines[::-1]))
@@ -1,9 +1,9 @@
-import cv2
 import numpy as np
 import logging
+from typing import Optional
+from core.analysis import ImageAnalysis
 from core.data_models import SplitResult, Image
 from strategies.base_strategy import BaseSplittingStrategy
-from utils.image_utils import find_precise_bounds
 
 
 class HorizontalProjectionSplitStrategy(BaseSplittingStrategy):
@@ -13,21 +13,26 @@ class HorizontalProjectionSplitStrategy(BaseSplittingStrategy):
     midpoint for the vertical split.
     """
 
-    def split(self, image: Image) -> SplitResult:
+    def split(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         try:
-            grayscale = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            analysis = analysis or ImageAnalysis(image)
             height, width, _ = image.shape
 
             # 1. Use Projection Profile for the horizontal axis
-            profile = np.sum(grayscale, axis=1)
+            profile = analysis.profiles.row_sums
             center_y = int(
                 np.argmin(profile[int(height * 0.4) : int(height * 0.6)])
                 + int(height * 0.4)
             )
-            bounds = find_precise_bounds(grayscale, width // 2, center_y, self.config)
+            # The divider spans the whole image, so measure it along its own
+            # axis: the run of flat lines of its colour around the minimum.
+            tolerance = self.config.get("divider_color_tolerance", 15)
+            bounds = analysis.profiles.uniform_run(0, center_y, tolerance)
             if bounds is None:
                 return self._failed_result("Could not find horizontal bounds.")
-            _, _, y_start, y_end = bounds
+            y_start, y_end = bounds
 
             # 2. Use a simple midpoint for the vertical axis
             x_split = width // 2
@@ -38,11 +43,19 @@ class HorizontalProjectionSplitStrategy(BaseSplittingStrategy):
                 image[y_end:height, 0:x_split],
                 image[y_end:height, x_split:width],
             ]
+            panel_rects = [
+                (0, 0, x_split, y_start),
+                (x_split, 0, width - x_split, y_start),
+                (0, y_end, x_split, height - y_end),
+                (x_split, y_end, width - x_split, height - y_end),
+            ]
             return SplitResult(
                 success=True,
                 strategy_used="horizontal_projection_split",
                 confidence=0.9,
                 images=images,
+                panel_rects=panel_rects,
+                divider_bounds=(x_split, x_split, y_start, y_end),
             )
         except Exception as e:
             return self._failed_result(str(e))
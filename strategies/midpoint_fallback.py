@@ -1,5 +1,6 @@
 import logging
-from typing import List
+from typing import List, Optional
+from core.analysis import ImageAnalysis
 from core.data_models import SplitResult, Image
 from strategies.base_strategy import BaseSplittingStrategy
 
@@ -10,7 +11,9 @@ class MidpointFallbackStrategy(BaseSplittingStrategy):
     """
 
     # --- FIX: Add 'filename' to the method signature to match the base class ---
-    def split(self, image: Image, filename: str) -> SplitResult:
+    def split(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         try:
             height, width, _ = image.shape
             mid_x, mid_y = width // 2, height // 2
@@ -21,6 +24,12 @@ class MidpointFallbackStrategy(BaseSplittingStrategy):
             bottom_right = image[mid_y:height, mid_x:width]
 
             split_images: List[Image] = [top_left, top_right, bottom_left, bottom_right]
+            panel_rects = [
+                (0, 0, mid_x, mid_y),
+                (mid_x, 0, width - mid_x, mid_y),
+                (0, mid_y, mid_x, height - mid_y),
+                (mid_x, mid_y, width - mid_x, height - mid_y),
+            ]
 
             # This strategy does not find content, so it returns zero-size bounds
             bounds = [(0, 0, 0, 0)] * 4
@@ -31,6 +40,7 @@ class MidpointFallbackStrategy(BaseSplittingStrategy):
                 confidence=0.2,
                 images=split_images,
                 bounds=bounds,
+                panel_rects=panel_rects,
             )
         except Exception as e:
             return SplitResult(
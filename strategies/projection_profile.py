@@ -1,12 +1,12 @@
-import cv2
 import numpy as np
 import logging
-from typing import List, Tuple
+from typing import Optional, Tuple
 
+from core.analysis import ImageAnalysis
 from core.data_models import SplitResult, Image
 from strategies.base_strategy import BaseSplittingStrategy
-from utils.image_utils import find_precise_bounds, find_content_bounds
-from utils.debug_utils import save_projection_debug_image
+from utils.image_utils import find_precise_bounds
+from utils.profile_utils import ProjectionProfiles, line_variances
 
 
 class ProjectionProfileStrategy(BaseSplittingStrategy):
@@ -15,14 +15,16 @@ class ProjectionProfileStrategy(BaseSplittingStrategy):
     returns panels with their internal content bounds.
     """
 
-    def split(self, image: Image, filename: str) -> SplitResult:
+    def split(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         try:
-            grayscale_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            analysis = analysis or ImageAnalysis(image)
+            center_x, std_v = self._locate_divider(analysis, axis=1)
+            center_y, std_h = self._locate_divider(analysis, axis=0)
+            grayscale_image = analysis.gray
             height, width = grayscale_image.shape
 
-            center_x = self._find_split_point_by_variance(grayscale_image, axis=1)
-            center_y = self._find_split_point_by_variance(grayscale_image, axis=0)
-
             if center_x is None or center_y is None:
                 return self._failed_result(
                     "Could not find a valid low-variance split point."
@@ -36,48 +38,47 @@ class ProjectionProfileStrategy(BaseSplittingStrategy):
                     "Failed to determine precise divider bounds."
                 )
             x_start, x_end, y_start, y_end = bounds
+            # What to draw, if the debug writer samples this image.
+            debug_artifacts = (
+                {
+                    "projection": {
+                        "split_x": center_x,
+                        "split_y": center_y,
+                        "bounds": bounds,
+                    }
+                }
+                if self.debug
+                else {}
+            )
 
-            confidence = self._calculate_confidence(grayscale_image, center_x, center_y)
+            confidence = self._calculate_confidence(std_v, std_h)
             if confidence < self.config.get("confidence_threshold", 0.75):
-                return self._failed_result(
+                result = self._failed_result(
                     f"Divider confidence {confidence:.2f} is below threshold."
                 )
+                result.debug_artifacts = debug_artifacts
+                return result
 
             logging.info(
                 f"Found dividers at x=[{x_start}:{x_end}], y=[{y_start}:{y_end}] with confidence {confidence:.2f}"
             )
 
-            if self.debug:
-                debug_dir = "output_results/debug"
-                save_projection_debug_image(
-                    image,
-                    center_x,
-                    center_y,
-                    bounds,
-                    debug_dir,
-                    filename,
-                )
-
             images = [
                 image[0:y_start, 0:x_start],
                 image[0:y_start, x_end:width],
                 image[y_end:height, 0:x_start],
                 image[y_end:height, x_end:width],
             ]
+            panel_rects = [
+                (0, 0, x_start, y_start),
+                (x_end, 0, width - x_end, y_start),
+                (0, y_end, x_start, height - y_end),
+                (x_end, y_end, width - x_end, height - y_end),
+            ]
 
-            # --- FIX 1: Explicitly build the list to satisfy the type checker ---
-            relative_bounds: List[Tuple[int, int, int, int]] = []
-            for panel in images:
-                content_bound = find_content_bounds(panel, self.config)
-                if content_bound:
-                    # Ensure a fixed-size 4-tuple for the type checker by indexing explicitly
-                    cb0 = int(content_bound[0])
-                    cb1 = int(content_bound[1])
-                    cb2 = int(content_bound[2])
-                    cb3 = int(content_bound[3])
-                    relative_bounds.append((cb0, cb1, cb2, cb3))
-                else:
-                    relative_bounds.append((0, 0, 0, 0))
+            # Panels split on full dividers are written as they are, so their
+            # content bounds are never needed (see SplitResult.bounds).
+            relative_bounds = [(0, 0, 0, 0)] * 4
 
             return SplitResult(
                 success=True,
@@ -85,37 +86,73 @@ class ProjectionProfileStrategy(BaseSplittingStrategy):
                 confidence=confidence,
                 images=images,
                 bounds=relative_bounds,
+                panel_rects=panel_rects,
+                divider_bounds=(x_start, x_end, y_start, y_end),
+                debug_artifacts=debug_artifacts,
             )
         except Exception as e:
             return self._failed_result(str(e))
 
-    def _find_split_point_by_variance(self, gray_image: Image, axis: int) -> int | None:
-        """Finds the index with the minimum standard deviation in the central search zone."""
-        h, w = gray_image.shape
+    def _locate_divider(
+        self, analysis: ImageAnalysis, axis: int
+    ) -> Tuple[Optional[int], float]:
+        """
+        Finds the divider along 'axis' and returns its index together with
+        the standard deviation of the full line through it.
+
+        With 'pyramid_levels' set, the search runs on a downscaled copy and
+        only a narrow band of lines around its answer is re-examined at full
+        resolution, so the index is still exact at full scale.
+        """
+        coarse = analysis.downscaled(self.config.get("pyramid_levels", 0))
+        if coarse.scale == 1:
+            profiles = analysis.profiles
+            index = self._find_split_point_by_variance(profiles, axis)
+            if index is None:
+                return None, 0.0
+            std = profiles.row_std(index) if axis == 0 else profiles.column_std(index)
+            return index, std
+
+        coarse_index = self._find_split_point_by_variance(coarse.profiles, axis)
+        if coarse_index is None:
+            return None, 0.0
+        gray = analysis.gray
+        start, end = self._search_zone(gray.shape[axis])
+        # A coarse pixel covers 'scale' lines; allow one more on either side
+        # for the blur introduced by the pyramid.
+        scale = coarse.scale
+        low = max(start, (coarse_index - 1) * scale)
+        high = min(end, (coarse_index + 2) * scale)
+        if high <= low:
+            return None, 0.0
+        variances = line_variances(gray, axis, low, high)
+        offset = int(np.argmin(variances))
+        return low + offset, float(np.sqrt(variances[offset]))
+
+    def _search_zone(self, length: int) -> Tuple[int, int]:
+        """The central [start, end) range searched for a divider."""
         search_ratio = self.config.get("search_zone_ratio", 0.2)
+        center = length // 2
+        margin = int(length * search_ratio / 2)
+        return center - margin, center + margin
 
+    def _find_split_point_by_variance(
+        self, profiles: ProjectionProfiles, axis: int
+    ) -> int | None:
+        """Finds the index with the minimum standard deviation in the central search zone."""
         if axis == 0:  # Horizontal divider
-            center = h // 2
-            margin = int(h * search_ratio / 2)
-            start, end = center - margin, center + margin
-            search_area = gray_image[start:end, :]
-            variances = np.std(search_area, axis=1)
+            start, end = self._search_zone(profiles.height)
+            variances = profiles.row_variances(start, end)
         else:  # Vertical divider
-            center = w // 2
-            margin = int(w * search_ratio / 2)
-            start, end = center - margin, center + margin
-            search_area = gray_image[:, start:end]
-            variances = np.std(search_area, axis=0)
+            start, end = self._search_zone(profiles.width)
+            variances = profiles.column_variances(start, end)
 
+        # The variance is minimal exactly where the standard deviation is.
         return int(start + np.argmin(variances)) if variances.size > 0 else None
 
-    def _calculate_confidence(
-        self, gray_image: Image, split_x: int, split_y: int
-    ) -> float:
+    def _calculate_confidence(self, std_v: float, std_h: float) -> float:
         """Confidence is high when the standard deviation of the divider path is low."""
         max_variance = 50.0
-        std_v = np.std(gray_image[:, split_x])
-        std_h = np.std(gray_image[split_y, :])
 
         conf_v = max(0.0, 1.0 - (std_v / max_variance))
         conf_h = max(0.0, 1.0 - (std_h / max_variance))
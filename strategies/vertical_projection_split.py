@@ -1,9 +1,9 @@
-import cv2
 import numpy as np
 import logging
+from typing import Optional
+from core.analysis import ImageAnalysis
 from core.data_models import SplitResult, Image
 from strategies.base_strategy import BaseSplittingStrategy
-from utils.image_utils import find_precise_bounds
 
 
 class VerticalProjectionSplitStrategy(BaseSplittingStrategy):
@@ -13,21 +13,26 @@ class VerticalProjectionSplitStrategy(BaseSplittingStrategy):
     midpoint for the horizontal split.
     """
 
-    def split(self, image: Image) -> SplitResult:
+    def split(
+        self, image: Image, filename: str, analysis: Optional[ImageAnalysis] = None
+    ) -> SplitResult:
         try:
-            grayscale = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            analysis = analysis or ImageAnalysis(image)
             height, width, _ = image.shape
 
             # 1. Use Projection Profile for the vertical axis
-            profile = np.sum(grayscale, axis=0)
+            profile = analysis.profiles.column_sums
             center_x = int(
                 np.argmin(profile[int(width * 0.4) : int(width * 0.6)])
                 + int(width * 0.4)
             )
-            bounds = find_precise_bounds(grayscale, center_x, height // 2, self.config)
+            # The divider spans the whole image, so measure it along its own
+            # axis: the run of flat lines of its colour around the minimum.
+            tolerance = self.config.get("divider_color_tolerance", 15)
+            bounds = analysis.profiles.uniform_run(1, center_x, tolerance)
             if bounds is None:
                 return self._failed_result("Could not find vertical bounds.")
-            x_start, x_end, _, _ = bounds
+            x_start, x_end = bounds
 
             # 2. Use a simple midpoint for the horizontal axis
             y_split = height // 2
@@ -38,11 +43,19 @@ class VerticalProjectionSplitStrategy(BaseSplittingStrategy):
                 image[y_split:height, 0:x_start],
                 image[y_split:height, x_end:width],
             ]
+            panel_rects = [
+                (0, 0, x_start, y_split),
+                (x_end, 0, width - x_end, y_split),
+                (0, y_split, x_start, height - y_split),
+                (x_end, y_split, width - x_end, height - y_split),
+            ]
             return SplitResult(
                 success=True,
                 strategy_used="vertical_projection_split",
                 confidence=0.9,
                 images=images,
+                panel_rects=panel_rects,
+                divider_bounds=(x_start, x_end, y_split, y_split),
             )
         except Exception as e:
             return self._failed_result(str(e))
@@ -1,19 +1,27 @@
 import cv2
+import logging
+import multiprocessing.util
 import numpy as np
 import os
-from typing import List, Tuple
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.data_models import SplitResult
+from utils.image_utils import save_image
 
 Image = np.ndarray
 
+# When the debug images of a result are saved; see DebugArtifactWriter.
+SAMPLE_MODES = ("all", "every_nth", "low_confidence", "fallbacks")
+
 
-def save_projection_debug_image(
+def draw_projection_debug_image(
     original_image: Image,
     split_x: int,
     split_y: int,
     bounds: Tuple[int, int, int, int],
-    output_dir: str,
-    filename: str,  # Now used to create a unique name
-):
+) -> Image:
     debug_image = original_image.copy()
     h, w, _ = debug_image.shape
     x_start, x_end, y_start, y_end = bounds
@@ -21,24 +29,15 @@ def save_projection_debug_image(
     cv2.line(debug_image, (split_x, 0), (split_x, h), (255, 0, 0), 2)
     cv2.line(debug_image, (0, split_y), (w, split_y), (255, 0, 0), 2)
     cv2.rectangle(debug_image, (x_start, y_start), (x_end, y_end), (0, 255, 0), 3)
+    return debug_image
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # --- FIX: Make the output filename dynamic ---
-    base_name, ext = os.path.splitext(filename)
-    output_path = os.path.join(output_dir, f"{base_name}_debug_projection{ext}")
-    cv2.imwrite(output_path, debug_image)
 
-
-def save_contour_debug_image(
+def draw_contour_debug_image(
     original_image: Image,
     contours: List[np.ndarray],
     selected_contours: List[np.ndarray],
     sorted_boxes: List[Tuple[int, int, int, int]],
-    output_dir: str,
-    filename: str,  # Now used to create a unique name
-):
+) -> Image:
     debug_image = original_image.copy()
     cv2.drawContours(debug_image, contours, -1, (255, 0, 0), 2)
     cv2.drawContours(debug_image, selected_contours, -1, (0, 255, 0), 3)
@@ -54,11 +53,156 @@ def save_contour_debug_image(
             (0, 0, 255),
             2,
         )
+    return debug_image
+
+
+# SplitResult.debug_artifacts keys -> the function drawing that artifact from
+# its recorded arguments. The key also names the file: <image>_debug_<key>.
+DEBUG_DRAWERS: Dict[str, Callable[..., Image]] = {
+    "projection": draw_projection_debug_image,
+    "contours": draw_contour_debug_image,
+}
+
+
+class DebugArtifactWriter:
+    """
+    Draws and saves the debug images of split results on a background thread.
+
+    Strategies only record what to draw in SplitResult.debug_artifacts; the
+    copying, drawing and encoding happen here, off the processing path.
+    Results are sampled by 'sample': every one ("all"), every 'every_nth'
+    image, only those below 'confidence_below' or failed ("low_confidence"),
+    or only those that needed a fallback strategy ("fallbacks"). At most
+    'queue_size' images wait to be written; when the writer falls behind,
+    further artifacts are dropped rather than slowing the split down.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample: str = "all",
+        every_nth: int = 10,
+        confidence_below: float = 0.9,
+        queue_size: int = 8,
+    ):
+        if sample not in SAMPLE_MODES:
+            raise ValueError(
+                f"Unknown debug sample mode '{sample}'; expected one of {SAMPLE_MODES}."
+            )
+        self.directory = directory
+        self.sample = sample
+        self.every_nth = max(1, every_nth)
+        self.confidence_below = confidence_below
+        self.seen = 0
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(max(1, queue_size))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["DebugArtifactWriter"]:
+        if not (
+            config.get("debug_mode", False)
+            and config.get("save_debug_artifacts", False)
+        ):
+            return None
+        cfg = config.get("debug_artifacts", {})
+        return cls(
+            cfg.get("directory", "output_results/debug"),
+            sample=cfg.get("sample", "all"),
+            every_nth=cfg.get("every_nth", 10),
+            confidence_below=cfg.get("confidence_below", 0.9),
+            queue_size=cfg.get("queue_size", 8),
+        )
+
+    def close_at_exit(self):
+        """
+        Flushes the writer when this (worker) process exits. Pool workers
+        leave through multiprocessing's exit handlers rather than atexit.
+        """
+        multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def submit(self, image: Image, filename: str, result: SplitResult) -> bool:
+        """
+        Queues the debug images of 'result' if it is sampled; returns whether
+        it was. Never blocks.
+        """
+        with self._lock:
+            self.seen += 1
+            if not (result.debug_artifacts and self._sampled(result, self.seen)):
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="debug-writer", daemon=True
+                )
+                self._thread.start()
+        try:
+            self._queue.put_nowait((image, filename, dict(result.debug_artifacts)))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logging.debug(f"Debug writer is behind; dropped artifacts of {filename}.")
+            return False
+        return True
+
+    def _sampled(self, result: SplitResult, index: int) -> bool:
+        if self.sample == "every_nth":
+            return (index - 1) % self.every_nth == 0
+        if self.sample == "low_confidence":
+            return not result.success or result.confidence < self.confidence_below
+        if self.sample == "fallbacks":
+            # The first strategy tried is the classifier's pick (or the head
+            # of the pipeline); anything else accepted is a fallback.
+            attempts = result.attempts
+            return not result.success or bool(
+                attempts and attempts[0].strategy != result.strategy_used
+            )
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, image: Image, filename: str, artifacts: Dict[str, Any]):
+        base_name, ext = os.path.splitext(filename)
+        for kind, arguments in artifacts.items():
+            draw = DEBUG_DRAWERS.get(kind)
+            if draw is None:
+                logging.warning(f"No drawer for debug artifact '{kind}'.")
+                continue
+            try:
+                debug_image = draw(image, **arguments)
+            except Exception as e:
+                logging.error(f"Failed to draw '{kind}' debug image of {filename}: {e}")
+                continue
+            # The filename may include subdirectories of a recursive input tree
+            output_path = os.path.join(self.directory, f"{base_name}_debug_{kind}{ext}")
+            if save_image(debug_image, output_path):
+                with self._lock:
+                    self.written += 1
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    def flush(self):
+        """Waits until every queued artifact has been written."""
+        self._queue.join()
 
-    # --- FIX: Make the output filename dynamic ---
-    base_name, ext = os.path.splitext(filename)
-    output_path = os.path.join(output_dir, f"{base_name}_debug_contours{ext}")
-    cv2.imwrite(output_path, debug_image)
+    def close(self):
+        """Writes what is still queued and stops the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+        if self.seen:
+            logging.info(
+                f"Debug artifacts: {self.written} images written to "
+                f"{self.directory}, {self.dropped} results dropped."
+            )
@@ -1,11 +1,28 @@
 import cv2
 import logging
 import os
-from typing import Optional
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 import numpy as np
 
+from core.analysis import PYRAMID_MIN_SIDE
+from utils.tracing import bound, traced
+
 Image = np.ndarray
 
+# Threads encoding and writing output files, shared by every image; see
+# save_images. OpenCV releases the GIL while encoding, so the four panels of
+# an image are compressed in parallel. Resized with set_encode_workers.
+ENCODE_WORKERS = 4
+_encode_workers = ENCODE_WORKERS
+_encode_pool: Optional[ThreadPoolExecutor] = None
+_encode_pool_lock = threading.Lock()
+
+# Pixels of context a 5x5 blur, 3x3 Sobel and non-maximum suppression need.
+_EDGE_CONTEXT = 4
+
 def load_image(image_path: str) -> Optional[Image]:
     """Loads an image from the specified path."""
     if not os.path.exists(image_path):
@@ -22,25 +39,157 @@ def load_image(image_path: str) -> Optional[Image]:
         logging.error(f"An unexpected error occurred while loading {image_path}: {e}")
         return None
 
-def save_image(image: Image, output_path: str) -> bool:
-    """Saves an image to the specified path."""
+def read_image_bytes(image_path: str) -> Optional[bytes]:
+    """Reads the raw, still-encoded bytes of an image file."""
+    try:
+        with open(image_path, "rb") as f:
+            return f.read()
+    except Exception as e:
+        logging.error(f"Failed to read {image_path}: {e}")
+        return None
+
+def decode_image(data: bytes, source: str) -> Optional[Image]:
+    """Decodes an in-memory encoded image, exactly as cv2.imread would from disk."""
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            logging.error(f"Failed to decode image from {source}. It may be corrupt or an unsupported format.")
+            return None
+        logging.debug(f"Successfully decoded image: {source} with dimensions {image.shape}")
+        return image
+    except Exception as e:
+        logging.error(f"An unexpected error occurred while decoding {source}: {e}")
+        return None
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 scale using DCT scaling.
+_REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def is_jpeg(data: bytes) -> bool:
+    """Checks the JPEG signature of an encoded image."""
+    return data[:3] == b"\xff\xd8\xff"
+
+def decode_reduced_image(data: bytes, source: str, reduction: int) -> Optional[Image]:
+    """
+    Decodes a preview of an in-memory image at 1/'reduction' scale (2, 4 or 8).
+    For JPEGs this is much cheaper than a full decode, as libjpeg skips most of
+    the inverse DCT work.
+    """
+    flag = _REDUCED_DECODE_FLAGS.get(reduction)
+    if flag is None:
+        logging.error(f"Unsupported preview reduction {reduction}; expected 2, 4 or 8.")
+        return None
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+        if image is None:
+            logging.error(f"Failed to decode a preview of {source}.")
+        return image
+    except Exception as e:
+        logging.error(f"An unexpected error occurred while decoding a preview of {source}: {e}")
+        return None
+
+def save_image(image: Image, output_path: str, params: Optional[List[int]] = None) -> bool:
+    """
+    Saves an image to the specified path, in the format its extension names
+    and with the given cv2.IMWRITE_* 'params'. The file is encoded in memory,
+    written under a temporary name, flushed to disk and then renamed into
+    place, so the path never holds a partial image and the image survives a
+    crash once this returns True.
+    """
+    if not _write_file(image, output_path, params):
+        return False
+    _sync_directory(os.path.dirname(output_path))
+    return True
+
+def save_images(items: List[Tuple[Image, str]], params: Optional[List[int]] = None) -> List[str]:
+    """
+    Saves (image, path) pairs concurrently on the shared encoder pool, as
+    save_image does, and returns the paths that could not be written. Returns
+    only once every write has finished and is durable.
+    """
+    if len(items) <= 1:
+        return [path for image, path in items if not save_image(image, path, params)]
+    write = bound(traced("encode.file")(_write_file))
+    futures = [(path, _get_encode_pool().submit(write, image, path, params)) for image, path in items]
+    failed = [path for path, future in futures if not future.result()]
+    # The renames are only durable once the directories holding them are.
+    for directory in sorted({os.path.dirname(path) for _, path in items}):
+        _sync_directory(directory)
+    return failed
+
+def _write_file(image: Image, output_path: str, params: Optional[List[int]] = None) -> bool:
+    temp_path = None
     try:
         output_dir = os.path.dirname(output_path)
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        if output_dir and not os.path.exists(output_dir):
+            # exist_ok guards against a concurrent worker creating it first
+            os.makedirs(output_dir, exist_ok=True)
             logging.debug(f"Created output directory: {output_dir}")
-        cv2.imwrite(output_path, image)
+        # cv2.imwrite reports few failures; encoding first catches them all.
+        ok, encoded = cv2.imencode(os.path.splitext(output_path)[1], image, params or [])
+        if not ok:
+            logging.error(f"Failed to encode image for {output_path}.")
+            return False
+        fd, temp_path = tempfile.mkstemp(dir=output_dir or None, prefix=f".{os.path.basename(output_path)}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(encoded.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, output_path)
         logging.debug(f"Successfully saved image to: {output_path}")
         return True
     except Exception as e:
         logging.error(f"Failed to save image to {output_path}: {e}")
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
         return False
 
+def _sync_directory(directory: str):
+    """Flushes a directory entry to disk, where the platform allows it."""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return  # e.g. on Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def set_encode_workers(workers: int):
+    """Sets the number of encode threads, replacing the pool if it already exists with another size."""
+    global _encode_pool, _encode_workers
+    workers = max(1, workers)
+    with _encode_pool_lock:
+        if _encode_pool is not None and workers != _encode_workers:
+            _encode_pool.shutdown()
+            _encode_pool = None
+        _encode_workers = workers
+
+def _get_encode_pool() -> ThreadPoolExecutor:
+    global _encode_pool
+    with _encode_pool_lock:
+        if _encode_pool is None:
+            _encode_pool = ThreadPoolExecutor(max_workers=_encode_workers, thread_name_prefix="encode")
+        return _encode_pool
 
-def find_content_bounds(image: Image, config: dict) -> tuple[int, int, int, int] | None:
+
+@traced("find_content_bounds")
+def find_content_bounds(image: Image, config: dict, gray: Optional[Image] = None) -> tuple[int, int, int, int] | None:
     """
-    Finds the bounding box of the main content in an image panel using a robust
-    edge-detection (Canny) method.
+    Finds the bounding box of the main content in an image panel: the box
+    around all of its Canny edges. Pass the panel's grayscale view as 'gray'
+    when it is already available to skip the color conversion.
+
+    With 'bounds_pyramid_levels' set in the 'trimming' config, the content is
+    first located on a downscaled copy and only the region around it is
+    searched at full resolution (see _coarse_to_fine_bounds). That only pays
+    off when the content is small within the panel; the box differs from a
+    full pass only if the downscaled copy misses some content altogether.
     """
     # --- ROBUSTNESS FIX: Check if the image is empty ---
     if image is None or image.size == 0:
@@ -49,57 +198,140 @@ def find_content_bounds(image: Image, config: dict) -> tuple[int, int, int, int]
     try:
         trim_config = config.get("trimming", {})
         canny_threshold = trim_config.get("canny_threshold", 30)
+        levels = trim_config.get("bounds_pyramid_levels", 0)
 
-        grayscale = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(grayscale, (5, 5), 0)
-        edges = cv2.Canny(blurred, canny_threshold, canny_threshold * 2)
-        contours, _ = cv2.findContours(
-            edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
-
-        if not contours:
-            return None
-
-        all_points = np.vstack([c for c in contours])
-        x, y, w, h = cv2.boundingRect(all_points)
-        return (int(x), int(y), int(w), int(h))
+        grayscale = gray if gray is not None else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if levels > 0:
+            return _coarse_to_fine_bounds(grayscale, canny_threshold, levels)
+        return _mask_bounds(_content_edges(grayscale, canny_threshold))
     except Exception as e:
         logging.error(f"Error during edge-based content bounds detection: {e}.")
         return None
 
 
+def _content_edges(gray_image: Image, canny_threshold: int, high_threshold: int | None = None) -> Image:
+    blurred = cv2.GaussianBlur(gray_image, (5, 5), 0)
+    return cv2.Canny(blurred, canny_threshold, high_threshold or canny_threshold * 2)
+
+
+def _mask_bounds(mask: Image) -> tuple[int, int, int, int] | None:
+    """
+    The (x, y, w, h) box around the nonzero pixels of 'mask', or None if
+    there are none. Every pixel lies on or inside the outer contour of its
+    blob, so this is exactly the box around all external contours, without
+    tracing them.
+    """
+    x, y, w, h = cv2.boundingRect(mask)
+    return (int(x), int(y), int(w), int(h)) if w > 0 else None
+
+
+def _coarse_to_fine_bounds(gray_image: Image, canny_threshold: int, levels: int) -> tuple[int, int, int, int] | None:
+    """
+    Finds the content on a downscaled copy, then runs Canny at full
+    resolution only on the region around it. Hysteresis links weak edge
+    pixels to strong ones anywhere in the image, so the region is only
+    trusted if no edge candidate (a pixel above the low threshold) lies on
+    its border: then no edge crosses it, and the box is that of a full-image
+    pass. Otherwise the whole panel is searched.
+    """
+    coarse, scale = gray_image, 1
+    for _ in range(levels):
+        if min(coarse.shape) // 2 < PYRAMID_MIN_SIDE: break
+        coarse, scale = cv2.pyrDown(coarse), scale * 2
+    if scale == 1:  # Too small to downscale.
+        return _mask_bounds(_content_edges(gray_image, canny_threshold))
+    # Downscaling weakens thin edges, so the coarse pass uses half the
+    # thresholds: its box should enclose every full-resolution edge.
+    box = _mask_bounds(_content_edges(coarse, max(1, canny_threshold // 2)))
+    if box is None:  # Nothing even at the lower thresholds; check in full.
+        return _mask_bounds(_content_edges(gray_image, canny_threshold))
+
+    height, width = gray_image.shape
+    x, y, w, h = (v * scale for v in box)
+    # Two coarse pixels of margin, for the blur of the pyramid.
+    reach = 2 * scale
+    rows = (max(0, y - reach), min(height, y + h + reach))
+    cols = (max(0, x - reach), min(width, x + w + reach))
+    borders = [((r, r + 1), cols) for r in (rows[0], rows[1] - 1) if 0 < r < height - 1]
+    borders += [(rows, (c, c + 1)) for c in (cols[0], cols[1] - 1) if 0 < c < width - 1]
+    for border_rows, border_cols in borders:
+        # Both thresholds at the low one: every candidate counts as an edge.
+        if _region_edges(gray_image, border_rows, border_cols, canny_threshold, canny_threshold).any():
+            return _mask_bounds(_content_edges(gray_image, canny_threshold))
+    found = _mask_bounds(_region_edges(gray_image, rows, cols, canny_threshold))
+    if found is None:
+        return None
+    return found[0] + cols[0], found[1] + rows[0], found[2], found[3]
+
+
+def _region_edges(gray_image: Image, rows: tuple[int, int], cols: tuple[int, int], canny_threshold: int, high_threshold: int | None = None) -> Image:
+    """
+    The Canny edges of gray_image[rows, cols], computed with enough of the
+    surrounding image that the blur, gradients and non-maximum suppression
+    match a full-image pass. Hysteresis only follows weak edges within the
+    region, so weak edges linked to strong ones outside it are missing.
+    """
+    height, width = gray_image.shape
+    r0, r1 = max(0, rows[0] - _EDGE_CONTEXT), min(height, rows[1] + _EDGE_CONTEXT)
+    c0, c1 = max(0, cols[0] - _EDGE_CONTEXT), min(width, cols[1] + _EDGE_CONTEXT)
+    edges = _content_edges(gray_image[r0:r1, c0:c1], canny_threshold, high_threshold)
+    return edges[rows[0] - r0:rows[1] - r0, cols[0] - c0:cols[1] - c0]
+
+
+@traced("find_precise_bounds")
 def find_precise_bounds(gray_image: Image, center_x: int, center_y: int, config: dict) -> tuple[int, int, int, int] | None:
-    """Finds precise divider bounds using robust band-scanning."""
+    """
+    Finds precise divider bounds using robust band-scanning.
+
+    Starting at (center_x, center_y), the divider is grown outwards along
+    each axis for as long as the median of the band crossing it stays within
+    'divider_color_tolerance' of the divider colour. Band medians are computed
+    a whole block at a time rather than pixel by pixel.
+    """
     try:
         height, width = gray_image.shape
+        if not (0 <= center_x < width and 0 <= center_y < height): return None
         tolerance = config.get('divider_color_tolerance', 15)
         band_thickness = config.get('band_thickness', 21)
         half_band = band_thickness // 2
-        patch = gray_image[max(0, center_y - half_band):min(height, center_y + half_band + 1),
-                           max(0, center_x - half_band):min(width, center_x + half_band + 1)]
+        rows = slice(max(0, center_y - half_band), min(height, center_y + half_band + 1))
+        cols = slice(max(0, center_x - half_band), min(width, center_x + half_band + 1))
+        patch = gray_image[rows, cols]
         if patch.size == 0: return None
         divider_color = float(np.median(patch))
-        x_start = center_x
-        for x in range(center_x, -1, -1):
-            band = gray_image[max(0, center_y - half_band):min(height, center_y + half_band + 1), x]
-            if abs(np.median(band) - divider_color) > tolerance: break
-            x_start = x
-        x_end = center_x
-        for x in range(center_x, width):
-            band = gray_image[max(0, center_y - half_band):min(height, center_y + half_band + 1), x]
-            if abs(np.median(band) - divider_color) > tolerance: break
-            x_end = x
-        y_start = center_y
-        for y in range(center_y, -1, -1):
-            band = gray_image[y, max(0, center_x - half_band):min(width, center_x + half_band + 1)]
-            if abs(np.median(band) - divider_color) > tolerance: break
-            y_start = y
-        y_end = center_y
-        for y in range(center_y, height):
-            band = gray_image[y, max(0, center_x - half_band):min(width, center_x + half_band + 1)]
-            if abs(np.median(band) - divider_color) > tolerance: break
-            y_end = y
+        # Each strip holds one band per column (resp. row) of the image.
+        horizontal = gray_image[rows, :]
+        vertical = gray_image[:, cols].T
+        x_start = _scan_band(horizontal, center_x, -1, divider_color, tolerance)
+        x_end = _scan_band(horizontal, center_x, 1, divider_color, tolerance)
+        y_start = _scan_band(vertical, center_y, -1, divider_color, tolerance)
+        y_end = _scan_band(vertical, center_y, 1, divider_color, tolerance)
         return x_start, x_end + 1, y_start, y_end + 1
     except Exception as e:
         logging.error(f"Failed to find precise bounds with band scan: {e}")
         return None
+
+
+def _scan_band(strip: Image, center: int, step: int, divider_color: float, tolerance: float) -> int:
+    """
+    Walks from 'center' in direction 'step' (+1 or -1) across the columns of
+    'strip' and returns the last index whose band median is within
+    'tolerance' of 'divider_color' ('center' itself if the first one is not).
+    Medians are computed in blocks that double in size, so short scans stay
+    cheap and long ones need only a handful of numpy calls.
+    """
+    length = strip.shape[1]
+    last, position, block = center, center, 32
+    while 0 <= position < length:
+        if step > 0:
+            stop = min(length, position + block)
+            medians = np.median(strip[:, position:stop], axis=0)
+        else:
+            stop = max(-1, position - block)
+            medians = np.median(strip[:, stop + 1:position + 1], axis=0)[::-1]
+        outside = np.abs(medians - divider_color) > tolerance
+        if outside.any():
+            first_outside = int(np.argmax(outside))
+            return position + step * (first_outside - 1) if first_outside else last
+        last, position, block = stop - step, stop, block * 2
+    return last
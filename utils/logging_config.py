@@ -2,13 +2,14 @@ import logging
 import sys
 
 
-def setup_logging(debug: bool = False):
+def setup_logging(debug: bool = False, stream=None):
     """
     Configures the root logger for the application.
 
     Args:
         debug (bool): If True, sets the logging level to DEBUG for more verbose output.
                       Otherwise, sets it to INFO.
+        stream: Where log records are written; defaults to standard output.
     """
     log_level = logging.DEBUG if debug else logging.INFO
 
@@ -19,8 +20,8 @@ def setup_logging(debug: bool = False):
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    # Create a handler to print to the console (standard output)
-    handler = logging.StreamHandler(sys.stdout)
+    # Create a handler to print to the console (standard output by default)
+    handler = logging.StreamHandler(stream or sys.stdout)
 
     # Create a formatter and set it for the handler
     # Format: [TIMESTAMP] [LOG_LEVEL] [MODULE_NAME] MESSAGE
@@ -0,0 +1,96 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+Image = np.ndarray
+
+
+class ProjectionProfiles:
+    """
+    Row and column intensity profiles of a grayscale image: the sum and the
+    sum of squares of every row and every column, gathered in one pass with
+    exact integer accumulators.
+
+    Once built, the variance of any row or column, or of any run of them, is
+    available without touching the pixels again, so split-point searches
+    over arbitrary zones, divider measurement and confidence scoring all
+    share one pass over the image.
+    """
+
+    def __init__(self, gray_image: Image):
+        self.height, self.width = gray_image.shape
+        # uint16 holds 255 ** 2 exactly and keeps the squared copy small.
+        wide = gray_image.astype(np.uint16)
+        squares = wide * wide
+        self.row_sums = wide.sum(axis=1, dtype=np.int64)
+        self.row_square_sums = squares.sum(axis=1, dtype=np.int64)
+        self.column_sums = wide.sum(axis=0, dtype=np.int64)
+        self.column_square_sums = squares.sum(axis=0, dtype=np.int64)
+
+    def row_variances(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """The variance of each full row in [start, end)."""
+        return _variances(
+            self.row_sums[start:end], self.row_square_sums[start:end], self.width
+        )
+
+    def column_variances(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """The variance of each full column in [start, end)."""
+        return _variances(
+            self.column_sums[start:end],
+            self.column_square_sums[start:end],
+            self.height,
+        )
+
+    def row_std(self, row: int) -> float:
+        return float(np.sqrt(self.row_variances(row, row + 1)[0]))
+
+    def column_std(self, column: int) -> float:
+        return float(np.sqrt(self.column_variances(column, column + 1)[0]))
+
+    def uniform_run(
+        self, axis: int, index: int, tolerance: float
+    ) -> Optional[Tuple[int, int]]:
+        """
+        The run [start, end) of consecutive rows (axis 0) or columns (axis 1)
+        around 'index' that are flat and of the same intensity as line
+        'index': a divider spanning the whole image. Lines qualify when their
+        mean is within 'tolerance' of that of 'index' and their standard
+        deviation is at most 'tolerance'. None if 'index' is not flat itself.
+        """
+        if axis == 0:
+            means = self.row_sums / float(self.width)
+            variances = self.row_variances()
+        else:
+            means = self.column_sums / float(self.height)
+            variances = self.column_variances()
+        flat = (np.abs(means - means[index]) <= tolerance) & (
+            variances <= tolerance * tolerance
+        )
+        if not flat[index]:
+            return None
+        before = np.flatnonzero(~flat[:index])
+        after = np.flatnonzero(~flat[index:])
+        start = int(before[-1]) + 1 if before.size else 0
+        end = index + int(after[0]) if after.size else len(flat)
+        return start, end
+
+
+def _variances(sums: np.ndarray, square_sums: np.ndarray, count: int) -> np.ndarray:
+    # n * sum(x^2) - sum(x)^2 is exact in int64, so the only rounding left is
+    # the final division.
+    return (count * square_sums - sums * sums) / float(count * count)
+
+
+def line_variances(gray_image: Image, axis: int, start: int, end: int) -> np.ndarray:
+    """
+    The variance of each full row (axis 0) or column (axis 1) in [start, end),
+    computed from those lines alone. Matches ProjectionProfiles exactly, for
+    when only a narrow band of lines is needed.
+    """
+    lines = gray_image[start:end, :] if axis == 0 else gray_image[:, start:end].T
+    wide = lines.astype(np.uint16)
+    return _variances(
+        wide.sum(axis=1, dtype=np.int64),
+        (wide * wide).sum(axis=1, dtype=np.int64),
+        wide.shape[1],
+    )
@@ -0,0 +1,235 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from core.data_models import ImageOutcome, TraceSpan
+
+TRACE_FORMATS = ("jsonl", "chrome")
+
+# The trace of the image the current thread is working on, if tracing is on.
+_local = threading.local()
+
+
+class ImageTrace:
+    """
+    Collects the timed spans recorded while one image is processed. Spans
+    may be added from any thread that has the trace activated.
+    """
+
+    def __init__(self, image: str):
+        self.image = image
+        self.spans: List[TraceSpan] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: TraceSpan):
+        with self._lock:
+            self.spans.append(span)
+
+
+def current() -> Optional[ImageTrace]:
+    """The trace activated on this thread, or None when not tracing."""
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def activate(trace: Optional[ImageTrace]) -> Iterator[None]:
+    """
+    Makes 'trace' the current trace of this thread for the duration of the
+    block. Work handed to another thread must activate it there as well.
+    """
+    previous = current()
+    _local.trace = trace
+    try:
+        yield
+    finally:
+        _local.trace = previous
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Records the wall and CPU time of the block as a span of the current
+    trace. Costs a single attribute lookup when tracing is off.
+    """
+    trace = current()
+    if trace is None:
+        yield
+        return
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        trace.add(
+            TraceSpan(
+                name=name,
+                start=start,
+                wall=time.perf_counter() - start,
+                cpu=time.thread_time() - cpu_start,
+                pid=os.getpid(),
+                thread=threading.get_native_id(),
+            )
+        )
+
+
+def add_span(trace: Optional[ImageTrace], name: str, start: float, cpu: float):
+    """
+    Records a span that started at 'start' (time.perf_counter()) and ends
+    now, for work that moved between threads and so cannot be timed by
+    span(); its CPU time is whatever the caller attributes to it.
+    """
+    if trace is None:
+        return
+    trace.add(
+        TraceSpan(
+            name=name,
+            start=start,
+            wall=time.perf_counter() - start,
+            cpu=cpu,
+            pid=os.getpid(),
+            thread=threading.get_native_id(),
+        )
+    )
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of span()."""
+
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def bound(fn: Callable) -> Callable:
+    """
+    Wraps 'fn' so that, when run on another thread, it records its spans in
+    the trace that is current where bound() was called.
+    """
+    trace = current()
+    if trace is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with activate(trace):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def start_trace(config: dict, image: str) -> Optional[ImageTrace]:
+    """A new trace for 'image' if the 'tracing' config section enables it."""
+    if not config.get("tracing", {}).get("enabled", False):
+        return None
+    return ImageTrace(image)
+
+
+class TraceWriter:
+    """
+    Writes the spans carried by each ImageOutcome to a trace file, either as
+    JSONL (one span per line) or in the Chrome trace-event format, which
+    chrome://tracing and Perfetto can load. Wall times are also kept per
+    stage so percentiles can be reported at the end of the run.
+    """
+
+    def __init__(self, path: str, trace_format: str = "jsonl"):
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(
+                f"Unknown trace format '{trace_format}'; expected one of {TRACE_FORMATS}."
+            )
+        self.path = path
+        self.format = trace_format
+        # Stage name -> wall and CPU seconds of every span, compactly stored.
+        self.wall: Dict[str, array] = {}
+        self.cpu: Dict[str, array] = {}
+        trace_dir = os.path.dirname(path)
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        if self.format == "chrome":
+            # The trace-event array may be left unterminated if the run dies.
+            self._file.write("[\n")
+        self._first_event = True
+
+    @classmethod
+    def from_config(cls, config: dict, output_dir: str) -> Optional["TraceWriter"]:
+        cfg = config.get("tracing", {})
+        if not cfg.get("enabled", False):
+            return None
+        trace_format = cfg.get("format", "jsonl")
+        default_name = "trace.json" if trace_format == "chrome" else "trace.jsonl"
+        return cls(
+            cfg.get("path") or os.path.join(output_dir, default_name), trace_format
+        )
+
+    def record(self, outcome: ImageOutcome):
+        for s in outcome.spans:
+            self.wall.setdefault(s.name, array("d")).append(s.wall)
+            self.cpu.setdefault(s.name, array("d")).append(s.cpu)
+            if self.format == "chrome":
+                event = {
+                    "name": s.name,
+                    "cat": "stage",
+                    "ph": "X",
+                    "ts": round(s.start * 1e6, 1),
+                    "dur": round(s.wall * 1e6, 1),
+                    "pid": s.pid,
+                    "tid": s.thread,
+                    "args": {"image": outcome.name, "cpu_ms": round(s.cpu * 1e3, 3)},
+                }
+                separator = "" if self._first_event else ",\n"
+                self._file.write(separator + json.dumps(event))
+                self._first_event = False
+            else:
+                entry = {
+                    "image": outcome.name,
+                    "stage": s.name,
+                    "start": round(s.start, 6),
+                    "wall_ms": round(s.wall * 1e3, 3),
+                    "cpu_ms": round(s.cpu * 1e3, 3),
+                    "pid": s.pid,
+                    "thread": s.thread,
+                }
+                self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def percentiles(self) -> Dict[str, dict]:
+        """Per-stage span count and wall/CPU p50, p95 and p99 in milliseconds."""
+        stats = {}
+        for name in sorted(self.wall):
+            wall = np.percentile(np.frombuffer(self.wall[name]), [50, 95, 99]) * 1e3
+            cpu = np.percentile(np.frombuffer(self.cpu[name]), [50, 95, 99]) * 1e3
+            stats[name] = {
+                "count": len(self.wall[name]),
+                "wall_ms": [round(float(v), 3) for v in wall],
+                "cpu_ms": [round(float(v), 3) for v in cpu],
+            }
+        return stats
+
+    def log_summary(self):
+        logging.info(f"Stage timings (trace written to {self.path}):")
+        logging.info(
+            f"  {'stage':<36}{'count':>7}  wall p50 / p95 / p99 ms   cpu p50 / p95 / p99 ms"
+        )
+        for name, s in self.percentiles().items():
+            wall = " / ".join(f"{v:.1f}" for v in s["wall_ms"])
+            cpu = " / ".join(f"{v:.1f}" for v in s["cpu_ms"])
+            logging.info(f"  {name:<36}{s['count']:>7}  {wall:<24}  {cpu}")
+
+    def close(self):
+        if self.format == "chrome":
+            self._file.write("\n]\n")
+        self._file.close()